@@ -8,9 +8,72 @@ licenses restricting copying, distribution and decompilation.
 All Rights Reserved.
 '''
 
+import importlib
+from typing import TYPE_CHECKING
 
-from pmod.ext import *
-from pmod.dbx import *
-from pmod.script_server import *
-from pmod.script_server_model import *
-from pmod.script_server_user_func import *
+
+# public name → defining module, the module is imported on first attribute access
+# so `import pmod` stays cheap and pmod.get_env does not pull in psycopg2 or requests
+__lazy = {
+    'get_env'              : 'pmod.ext',
+    'print_table'          : 'pmod.ext',
+    'EnvWatch'             : 'pmod.ext',
+    'export_csv'           : 'pmod.ext',
+    'export_tsv'           : 'pmod.ext',
+    'export_jsonl'         : 'pmod.ext',
+    'export_parquet'       : 'pmod.ext',
+    'DBXRowFormat'         : 'pmod.dbx',
+    'DBXCopyFormat'        : 'pmod.dbx',
+    'dbx_conn_options'     : 'pmod.dbx',
+    'DBXCursor'            : 'pmod.dbx',
+    'DBXConnection'        : 'pmod.dbx',
+    'DBXCopyReader'        : 'pmod.dbx',
+    'DBXRowIterator'       : 'pmod.dbx',
+    'DBXTransaction'       : 'pmod.dbx',
+    'DBXPool'              : 'pmod.dbx',
+    'DBX'                  : 'pmod.dbx',
+    'dbx_numpy_columns'    : 'pmod.dbx_columns',
+    'dbx_arrow_table'      : 'pmod.dbx_columns',
+    'DBXCache'             : 'pmod.dbx_cache',
+    'dbx_wait'             : 'pmod.dbx_async',
+    'AsyncDBXPool'         : 'pmod.dbx_async',
+    'AsyncDBX'             : 'pmod.dbx_async',
+    'ScripServer'          : 'pmod.script_server',
+    'ScriptServerConf'     : 'pmod.script_server_model',
+    'ScriptServerEnv'      : 'pmod.script_server_model',
+    'ScriptServerUserFunc' : 'pmod.script_server_user_func',
+    'ScriptServerUtil'     : 'pmod.script_server_util',
+}
+
+__all__ = list(__lazy)
+
+
+def __getattr__(name: str):
+    module = __lazy.get(name)
+    if module is None:
+        # submodules stay reachable as attributes, e.g. pmod.dbx.DBX
+        try:
+            return importlib.import_module(f'pmod.{name}')
+        except ModuleNotFoundError as err:
+            if err.name != f'pmod.{name}':
+                raise
+        raise AttributeError(f"module 'pmod' has no attribute '{name}'")
+
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
+
+if TYPE_CHECKING:
+    from pmod.ext import *
+    from pmod.dbx import *
+    from pmod.dbx_cache import *
+    from pmod.dbx_async import *
+    from pmod.script_server import *
+    from pmod.script_server_model import *
+    from pmod.script_server_user_func import *
+    from pmod.script_server_util import ScriptServerUtil
@@ -0,0 +1,176 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+import json
+import time
+import asyncio
+import threading
+from typing import Awaitable, Callable
+
+
+class LatencyHistogram:
+    __bits : int = 10
+    count  : int = 0
+    total  : int = 0
+    min    : int = 0
+    max    : int = 0
+
+    def __init__(self, precision_bits: int = 10):
+        # hdr style buckets: exact below 2^bits µs, above that the relative error stays under 1 / 2^bits
+        self.__bits = precision_bits
+        self.__counts: dict[int, int] = {}
+        self.__lock = threading.Lock()
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, seconds: float):
+        value = max(0, int(seconds * 1_000_000))
+        shift = max(0, value.bit_length() - self.__bits)
+        bucket = (value >> shift) << shift
+
+        with self.__lock:
+            self.__counts[bucket] = self.__counts.get(bucket, 0) + 1
+            self.min = value if self.count == 0 else min(self.min, value)
+            self.max = max(self.max, value)
+            self.count += 1
+            self.total += value
+
+    def merge(self, other: 'LatencyHistogram'):
+        with self.__lock:
+            for bucket, count in other.__counts.items():
+                self.__counts[bucket] = self.__counts.get(bucket, 0) + count
+            if other.count > 0:
+                self.min = other.min if self.count == 0 else min(self.min, other.min)
+                self.max = max(self.max, other.max)
+            self.count += other.count
+            self.total += other.total
+
+    def percentile(self, percent: float) -> float:
+        with self.__lock:
+            if self.count == 0:
+                return 0
+
+            target = max(1, round(self.count * percent / 100))
+            seen = 0
+            for bucket in sorted(self.__counts):
+                seen += self.__counts[bucket]
+                if seen >= target:
+                    shift = max(0, bucket.bit_length() - self.__bits)
+                    # middle of the bucket, clamped to what was actually observed
+                    value = min(max(bucket + (1 << shift) // 2, self.min), self.max)
+                    return value / 1_000_000
+
+            return self.max / 1_000_000
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'min'  : self.min / 1_000_000,
+            'mean' : 0 if self.count == 0 else self.total / self.count / 1_000_000,
+            'p50'  : self.percentile(50),
+            'p90'  : self.percentile(90),
+            'p99'  : self.percentile(99),
+            'p999' : self.percentile(99.9),
+            'max'  : self.max / 1_000_000,
+        }
+
+
+class BenchReport:
+    name     : str              = ''
+    duration : float            = 0
+    requests : int              = 0
+    errors   : int              = 0
+    outcomes : dict[str, int]   = {}
+    latency  : LatencyHistogram | None = None
+
+    def __init__(self, name: str):
+        self.name = name
+        self.duration = 0
+        self.requests = 0
+        self.errors = 0
+        self.outcomes = {}
+        self.latency = LatencyHistogram()
+
+    def to_dict(self) -> dict:
+        return {
+            'name'      : self.name,
+            'duration'  : self.duration,
+            'requests'  : self.requests,
+            'errors'    : self.errors,
+            'error_rate': 0 if self.requests == 0 else self.errors / self.requests,
+            'throughput': 0 if self.duration == 0 else self.requests / self.duration,
+            'outcomes'  : self.outcomes,
+            'latency'   : self.latency.summary(),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def print(self):
+        data = self.to_dict()
+        latency = data['latency']
+        print(f'\n{self.name}')
+        print(f'duration   : {data["duration"]:.2f}s')
+        print(f'requests   : {data["requests"]} ({data["throughput"]:.1f}/s)')
+        print(f'errors     : {data["errors"]} ({data["error_rate"] * 100:.2f}%)')
+        print(f'outcomes   : {", ".join([f"{key}={val}" for key, val in sorted(data["outcomes"].items())])}')
+        print('latency ms : ' + ', '.join([f'{key} {latency[key] * 1000:.2f}' for key in ['min', 'mean', 'p50', 'p90', 'p99', 'p999', 'max']]))
+
+
+async def bench_run(name: str, call: Callable[[], Awaitable[tuple[str, bool]]], concurrency: int = 10, rps: float | None = None, duration: float = 10) -> BenchReport:
+    # call returns (outcome label, ok), raising counts as an error labelled with the exception type.
+    # without rps, concurrency workers loop back to back (closed loop).
+    # with rps, calls start on a fixed schedule and concurrency caps the in-flight calls (open loop),
+    # latency is measured from the scheduled start so queueing delay is not hidden.
+    report = BenchReport(name)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def one(scheduled: float):
+        async with semaphore:
+            try:
+                outcome, ok = await call()
+            except Exception as err:
+                outcome, ok = type(err).__name__, False
+
+        report.latency.record(time.perf_counter() - scheduled)
+        report.requests += 1
+        report.outcomes[outcome] = report.outcomes.get(outcome, 0) + 1
+        if not ok:
+            report.errors += 1
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await one(time.perf_counter())
+
+    if rps is None:
+        await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+    else:
+        tasks = []
+        interval = 1 / rps
+        index = 0
+        while True:
+            scheduled = start + index * interval
+            if scheduled >= deadline:
+                break
+
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            tasks.append(asyncio.create_task(one(scheduled)))
+            index += 1
+        await asyncio.gather(*tasks)
+
+    report.duration = time.perf_counter() - start
+    return report
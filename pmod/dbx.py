@@ -8,14 +8,454 @@ licenses restricting copying, distribution and decompilation.
 All Rights Reserved.
 '''
 
+import io
+import re
+import csv
+import time
+import uuid
+import itertools
+import threading
 import psycopg2
+import psycopg2.extras
+import psycopg2.extensions
+from enum import Enum
+from psycopg2 import sql
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager, ExitStack
+from typing import Any, Callable, Iterable, Iterator
+from pmod.dbx_cache import DBXCache
+from pmod.dbx_columns import dbx_numpy_columns, dbx_arrow_table
+
+
+class DBXRowFormat(Enum):
+    dict       = 1
+    tuple      = 2
+    namedtuple = 3
+    columnar   = 4
+
+
+class DBXCopyFormat(Enum):
+    csv = 1
+    tsv = 2
+
+
+def dbx_conn_options(tz: str | None) -> str | None:
+    # libpq splits options on whitespace, backslash escapes keep the value as one token
+    if tz is None:
+        return None
+    value = tz.replace('\\', '\\\\').replace(' ', '\\ ')
+    return f'-c TimeZone={value}'
+
+
+class DBXCursor(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        self.connection.dbx_round_trips += 1
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        self.connection.dbx_round_trips += len(vars_list)
+        return super().executemany(query, vars_list)
+
+    def callproc(self, procname, parameters=None):
+        self.connection.dbx_round_trips += 1
+        return super().callproc(procname, parameters)
+
+    def copy_expert(self, sql, file, size=8192):
+        self.connection.dbx_round_trips += 1
+        return super().copy_expert(sql, file, size)
+
+    def fetchone(self):
+        self.__count_fetch()
+        return super().fetchone()
+
+    def fetchmany(self, size=None):
+        self.__count_fetch()
+        return super().fetchmany(self.arraysize if size is None else size)
+
+    def fetchall(self):
+        self.__count_fetch()
+        return super().fetchall()
+
+    def __count_fetch(self):
+        # client side cursors already hold the result, only named cursors go back to the server
+        if self.name is not None:
+            self.connection.dbx_round_trips += 1
+
+
+class DBXConnection(psycopg2.extensions.connection):
+    dbx_state      : dict  = {}
+    dbx_last_used  : float = 0
+    dbx_round_trips: int   = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = DBXCursor
+        self.dbx_state = {}
+        self.dbx_last_used = time.monotonic()
+        self.dbx_round_trips = 0
+
+    def commit(self):
+        self.__count_end()
+        return super().commit()
+
+    def rollback(self):
+        self.__count_end()
+        return super().rollback()
+
+    def __count_end(self):
+        # psycopg2 sends nothing when no transaction is open
+        if not self.closed and self.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            self.dbx_round_trips += 1
+
+
+class DBXCopyReader:
+    __rows      : Iterator | None    = None
+    __columns   : list[str] | None   = None
+    __format    : DBXCopyFormat      = DBXCopyFormat.csv
+    __chunk_rows: int                = 1000
+
+    def __init__(self, rows: Iterable, columns: list[str] | None = None, format: DBXCopyFormat = DBXCopyFormat.csv, chunk_rows: int = 1000):
+        self.__rows = iter(rows)
+        self.__columns = columns
+        self.__format = format
+        self.__chunk_rows = chunk_rows
+        self.__pending = ''
+
+        first = next(self.__rows, None)
+        if first is not None:
+            if isinstance(first, dict) and self.__columns is None:
+                self.__columns = list(first.keys())
+            self.__rows = itertools.chain([first], self.__rows)
+
+    @property
+    def columns(self) -> list[str] | None:
+        return self.__columns
+
+    def read(self, size: int = -1) -> str:
+        # serialize lazily, only about one chunk of rows is held as text at a time
+        while size < 0 or len(self.__pending) < size:
+            chunk = self.__next_chunk()
+            if chunk == '':
+                break
+            self.__pending += chunk
+
+        if size < 0:
+            size = len(self.__pending)
+
+        data, self.__pending = self.__pending[:size], self.__pending[size:]
+        return data
+
+    def __next_chunk(self) -> str:
+        rows = list(itertools.islice(self.__rows, self.__chunk_rows))
+        if len(rows) == 0:
+            return ''
+
+        if self.__columns is not None:
+            rows = [[row[col] for col in self.__columns] if isinstance(row, dict) else row for row in rows]
+
+        if self.__format == DBXCopyFormat.tsv:
+            return ''.join(['\t'.join([self.__tsv_value(val) for val in row]) + '\n' for row in rows])
+
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_NOTNULL, lineterminator='\n').writerows(rows)
+        return buffer.getvalue()
+
+    def __tsv_value(self, val: Any) -> str:
+        if val is None:
+            return '\\N'
+        return str(val).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class DBXRowIterator:
+    # owns the connection and named cursor of DBX.iter_fetches, they go back once the rows run out,
+    # on close() or when the iterator is dropped, also if it was never iterated
+    def __init__(self, rows: Iterator, stack: ExitStack):
+        self.__rows = rows
+        self.__stack: ExitStack | None = stack
+
+    def __iter__(self) -> 'DBXRowIterator':
+        return self
+
+    def __next__(self):
+        if self.__stack is None:
+            raise StopIteration
+
+        try:
+            return next(self.__rows)
+        except StopIteration:
+            self.__release(None, None, None)
+            raise
+        except BaseException as err:
+            self.__release(type(err), err, err.__traceback__)
+            raise
+
+    def __enter__(self) -> 'DBXRowIterator':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        # an unfinished read is rolled back, not committed
+        self.__release(GeneratorExit, GeneratorExit(), None)
+
+    def __release(self, *exc_info):
+        stack, self.__stack = self.__stack, None
+        if stack is not None:
+            stack.__exit__(*exc_info)
+
+
+class DBXTransaction:
+    err: Exception | None = None
+
+    def __init__(self, conn: DBXConnection, execute: Callable, fetches: Callable):
+        self.__conn = conn
+        self.__execute = execute
+        self.__fetches = fetches
+        self.__writes: list[str] = []
+        self.__savepoints = 0
+        self.err = None
+
+    @property
+    def writes(self) -> list[str]:
+        return self.__writes
+
+    def fetches(self, query, vars: list = [], row_format: DBXRowFormat = DBXRowFormat.dict) -> tuple[list | dict | None, Exception | None]:
+        return self.__run(lambda cur: self.__fetches(self.__conn, cur, query, vars, row_format))
+
+    def fetch_columns(self, query, vars: list = [], arrow: bool = False) -> tuple[dict | Any | None, Exception | None]:
+        def run(cur: any):
+            self.__execute(self.__conn, cur, query, vars)
+            return DBX.format_columns(list(cur.description), cur.fetchall(), arrow)
+
+        return self.__run(run)
+
+    def exec(self, query, vars: list = []) -> Exception | None:
+        _, err = self.__run(lambda cur: self.__execute(self.__conn, cur, query, vars), query)
+        return err
+
+    def exec_many(self, query, vars_list: Iterable, page_size: int = 1000, values: bool = False, template: str | None = None) -> Exception | None:
+        def run(cur: any):
+            if values:
+                psycopg2.extras.execute_values(cur, query, vars_list, template=template, page_size=page_size)
+            else:
+                psycopg2.extras.execute_batch(cur, query, vars_list, page_size=page_size)
+
+        _, err = self.__run(run, query)
+        return err
+
+    def exec_batch(self, queries: list[str | tuple[str, list]]) -> Exception | None:
+        # statements are bound client side and sent together, one round trip for the whole batch
+        def run(cur: any):
+            stmts = []
+            for item in queries:
+                query, vars = (item, []) if isinstance(item, str) else item
+                stmts.append(cur.mogrify(query, vars if len(vars) > 0 else None))
+            if len(stmts) > 0:
+                cur.execute(b';\n'.join(stmts))
+
+        _, err = self.__run(run, *[item if isinstance(item, str) else item[0] for item in queries])
+        return err
+
+    @contextmanager
+    def savepoint(self) -> Iterator['DBXTransaction']:
+        if self.err is not None:
+            raise self.err
+
+        self.__savepoints += 1
+        name = f'dbx_sp{self.__savepoints}'
+        writes = len(self.__writes)
+        with self.__conn.cursor() as cur:
+            cur.execute(f'SAVEPOINT {name}')
+
+        try:
+            yield self
+        except BaseException:
+            self.__rollback_to(name, writes)
+            raise
+
+        if self.err is not None:
+            # the failure stays inside the savepoint, the outer transaction can go on
+            self.__rollback_to(name, writes)
+            self.err = None
+            return
+
+        with self.__conn.cursor() as cur:
+            cur.execute(f'RELEASE SAVEPOINT {name}')
+
+    def __run(self, func: Callable[[any], Any], *writes: str) -> tuple[Any, Exception | None]:
+        # after a failure postgres rejects everything until rollback, keep returning the first error
+        if self.err is not None:
+            return None, self.err
+
+        try:
+            with self.__conn.cursor() as cur:
+                res = func(cur)
+            self.__writes.extend([query for query in writes if isinstance(query, str)])
+            return res, None
+        except Exception as err:
+            self.err = err
+            return None, err
+
+    def __rollback_to(self, name: str, writes: int):
+        del self.__writes[writes:]
+        with self.__conn.cursor() as cur:
+            cur.execute(f'ROLLBACK TO SAVEPOINT {name}')
+            cur.execute(f'RELEASE SAVEPOINT {name}')
+
+
+class DBXPool:
+    __conn        : dict         = {}
+    __min_size    : int          = 1
+    __max_size    : int          = 10
+    __idle_timeout: float        = 300
+    __check_after : float        = 30
+    __wait_timeout: float | None = None
+    __on_connect  : Callable[[DBXConnection], None] | None = None
+
+    def __init__(self, conn: dict, min_size: int = 1, max_size: int = 10, idle_timeout: float = 300, check_after: float = 30, wait_timeout: float | None = None, on_connect: Callable[[DBXConnection], None] | None = None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f'invalid pool size, min: {min_size}, max: {max_size}')
+
+        self.__conn = conn
+        self.__min_size = min_size
+        self.__max_size = max_size
+        self.__idle_timeout = idle_timeout
+        self.__check_after = check_after
+        self.__wait_timeout = wait_timeout
+        self.__on_connect = on_connect
+
+        self.__cond = threading.Condition()
+        self.__idle: list[DBXConnection] = []
+        self.__size = 0
+        self.__closed = False
+
+    def getconn(self) -> DBXConnection:
+        deadline = None if self.__wait_timeout is None else time.monotonic() + self.__wait_timeout
+
+        while True:
+            conn = self.__checkout(deadline)
+            if conn is None:
+                return self.__open()
+
+            if self.__healthy(conn):
+                return conn
+
+            self.putconn(conn, discard=True)
+
+    def putconn(self, conn: DBXConnection, discard: bool = False):
+        if not discard and not conn.closed and conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self.__cond:
+            if discard or conn.closed or self.__closed:
+                self.__size -= 1
+                self.__close(conn)
+            else:
+                conn.dbx_last_used = time.monotonic()
+                self.__idle.append(conn)
+            self.__cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[DBXConnection]:
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def close(self):
+        with self.__cond:
+            self.__closed = True
+            for conn in self.__idle:
+                self.__close(conn)
+            self.__size -= len(self.__idle)
+            self.__idle.clear()
+            self.__cond.notify_all()
+
+    def __checkout(self, deadline: float | None) -> DBXConnection | None:
+        with self.__cond:
+            while True:
+                if self.__closed:
+                    raise psycopg2.InterfaceError('connection pool is closed')
+
+                self.__evict_idle()
+
+                # most recently used first, keeps the rest of the stack cold for eviction
+                if len(self.__idle) > 0:
+                    return self.__idle.pop()
+
+                if self.__size < self.__max_size:
+                    self.__size += 1
+                    return None
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise psycopg2.OperationalError(f'timeout waiting for a pooled connection, max size: {self.__max_size}')
+
+                self.__cond.wait(remaining)
+
+    def __open(self) -> DBXConnection:
+        try:
+            conn = psycopg2.connect(connection_factory=DBXConnection, **self.__conn)
+            if self.__on_connect is not None:
+                self.__on_connect(conn)
+                conn.commit()
+            return conn
+        except Exception:
+            with self.__cond:
+                self.__size -= 1
+                self.__cond.notify()
+            raise
+
+    def __healthy(self, conn: DBXConnection) -> bool:
+        if conn.closed:
+            return False
+
+        if time.monotonic() - conn.dbx_last_used < self.__check_after:
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def __evict_idle(self):
+        now = time.monotonic()
+        while len(self.__idle) > 0 and self.__size > self.__min_size and now - self.__idle[0].dbx_last_used > self.__idle_timeout:
+            self.__close(self.__idle.pop(0))
+            self.__size -= 1
+
+    def __close(self, conn: DBXConnection):
+        try:
+            conn.close()
+        except Exception:
+            ...
 
 
 class DBX:
-    __conn   : dict       = {}
-    __conn_tz: str | None = None
+    __conn        : dict            = {}
+    __pool        : DBXPool | None  = None
+    __prepare_size: int             = 0
+    __cache       : DBXCache | None = None
+    __cache_space : str             = ''
+    __stats       : dict            = {}
+    __row_classes : dict            = {}
+    __preparable  : re.Pattern      = re.compile(r'(?:\s|\(|--[^\n]*(?:\n|$)|/\*.*?\*/)*([A-Za-z]+)', re.DOTALL)
 
-    def __init__(self, name: str|None = None, host: str|None = None, port: str|None = None, usr: str|None = None, pwd: str|None = None, tz: str|None = None, kv: dict|None = None, prefix: str|None = None):
+    def __init__(self, name: str|None = None, host: str|None = None, port: str|None = None, usr: str|None = None, pwd: str|None = None, tz: str|None = None, kv: dict|None = None, prefix: str|None = None,
+                 pool: bool = False, pool_min: int = 1, pool_max: int = 10, pool_idle_timeout: float = 300, pool_wait_timeout: float | None = None, prepare_cache_size: int = 0,
+                 cache: DBXCache | None = None):
         if kv is not None and prefix is not None:
             name = kv[f'{prefix}_NAME']
             host = kv[f'{prefix}_HOST']
@@ -24,7 +464,6 @@ class DBX:
             pwd  = kv[f'{prefix}_PASS']
             tz   = kv[f'{prefix}_TZ']
 
-        self.__conn_tz = tz
         self.__conn = {
             'database': name,
             'host'    : host,
@@ -33,41 +472,344 @@ class DBX:
             'password': pwd,
         }
 
-    def fetches(self, query, vars: list = []) -> tuple[list | None, Exception | None]:
+        # applied by the server at connection startup, no extra statement per call
+        if tz is not None:
+            self.__conn['options'] = dbx_conn_options(tz)
+
+        self.__prepare_size = prepare_cache_size
+        self.__cache = cache
+        # one cache may serve several databases, entries are keyed by where they came from
+        self.__cache_space = f'{usr}@{host}:{port}/{name}?tz={tz}'
+        self.__stats_lock = threading.Lock()
+        self.__stats = {'calls': 0, 'round_trips': 0, 'last_round_trips': 0, 'prepared_hits': 0, 'prepared_misses': 0, 'prepared_evictions': 0}
+
+        if pool:
+            self.__pool = DBXPool(self.__conn, min_size=pool_min, max_size=pool_max, idle_timeout=pool_idle_timeout, wait_timeout=pool_wait_timeout)
+
+    def fetches(self, query, vars: list = [], row_format: DBXRowFormat = DBXRowFormat.dict, use_cache: bool = True, cache_tags: list[str] | None = None, cache_ttl: float | None = None) -> tuple[list | dict | None, Exception | None]:
+        use_cache = use_cache and self.__cache is not None
+        if use_cache:
+            rows, hit = self.__cache.get(query, vars, row_format.name, namespace=self.__cache_space)
+            if hit:
+                return rows, None
+
         try:
-            with psycopg2.connect(**self.__conn) as conn:
+            with self.__connection() as conn:
                 with conn.cursor() as cur:
-                    return self.__fetches(cur, query, vars), None
+                    rows = self.__fetches(conn, cur, query, vars, row_format)
+        except Exception as err:
+            return None, err
+
+        if use_cache:
+            self.__cache.set(query, vars, rows, row_format.name, tags=cache_tags, ttl=cache_ttl, namespace=self.__cache_space)
+        return rows, None
+
+    def fetch_columns(self, query, vars: list = [], arrow: bool = False) -> tuple[dict | Any | None, Exception | None]:
+        try:
+            with self.__connection() as conn:
+                with conn.cursor() as cur:
+                    self.__execute(conn, cur, query, vars)
+                    description = list(cur.description)
+                    rows = cur.fetchall()
+
+            return self.format_columns(description, rows, arrow), None
         except Exception as err:
             return None, err
 
     def exec(self, query, vars: list = []) -> Exception | None:
         try:
-            with psycopg2.connect(**self.__conn) as conn:
+            with self.__connection() as conn:
                 with conn.cursor() as cur:
-                    if len(vars) > 0:
-                        cur.execute(query, vars)
+                    self.__execute(conn, cur, query, vars)
+        except Exception as err:
+            return err
+
+        self.__invalidate(query)
+
+    def exec_many(self, query, vars_list: Iterable, page_size: int = 1000, values: bool = False, template: str | None = None) -> Exception | None:
+        try:
+            with self.__connection() as conn:
+                with conn.cursor() as cur:
+                    if values:
+                        psycopg2.extras.execute_values(cur, query, vars_list, template=template, page_size=page_size)
                     else:
-                        cur.execute(query)
+                        psycopg2.extras.execute_batch(cur, query, vars_list, page_size=page_size)
         except Exception as err:
             return err
 
-    def __fetches(self, cur: any, query, vars=[]) -> list:
-        if self.__conn_tz is not None:
-            cur.execute(f"SET TIME ZONE '{self.__conn_tz}';")
-
-        if len(vars) > 0:
-            cur.execute(query, vars)
-        else:
-            cur.execute(query)
-
-        columns = list(cur.description)
-        rows = cur.fetchall()
-        results = []
-        for row in rows:
-            row_dict = {}
-            for i, col in enumerate(columns):
-                row_dict[col.name] = row[i]
-            results.append(row_dict)
-
-        return results
+        self.__invalidate(query)
+
+    def copy_from(self, table: str, source: Any, columns: list[str] | None = None, format: DBXCopyFormat = DBXCopyFormat.csv, header: bool = False, chunk_size: int = 65536) -> Exception | None:
+        try:
+            with ExitStack() as stack:
+                if isinstance(source, str):
+                    source = stack.enter_context(open(source, 'r', encoding='utf-8', newline=''))
+                elif not hasattr(source, 'read'):
+                    source = DBXCopyReader(source, columns, format)
+                    columns = source.columns
+                    header = False
+
+                stmt = sql.SQL('COPY {} {} FROM STDIN WITH ({})').format(self.__copy_table(table), self.__copy_columns(columns), self.__copy_options(format, header))
+                with self.__connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.copy_expert(stmt, source, size=chunk_size)
+        except Exception as err:
+            return err
+
+        if self.__cache is not None:
+            self.__cache.invalidate_tag(table.lower(), table.lower().split('.')[-1])
+
+    def copy_to(self, dest: Any, table: str | None = None, query: str | None = None, vars: list = [], columns: list[str] | None = None, format: DBXCopyFormat = DBXCopyFormat.csv, header: bool = False, chunk_size: int = 65536) -> Exception | None:
+        try:
+            with ExitStack() as stack:
+                if isinstance(dest, str):
+                    dest = stack.enter_context(open(dest, 'w', encoding='utf-8', newline=''))
+
+                with self.__connection() as conn:
+                    with conn.cursor() as cur:
+                        if query is not None:
+                            source = sql.SQL('({})').format(sql.SQL(cur.mogrify(query, vars if len(vars) > 0 else None).decode()))
+                        elif table is not None:
+                            source = sql.SQL('{} {}').format(self.__copy_table(table), self.__copy_columns(columns))
+                        else:
+                            raise ValueError('copy_to requires a table or a query')
+
+                        stmt = sql.SQL('COPY {} TO STDOUT WITH ({})').format(source, self.__copy_options(format, header))
+                        cur.copy_expert(stmt, dest, size=chunk_size)
+        except Exception as err:
+            return err
+
+    def iter_fetches(self, query, vars: list = [], batch_size: int = 1000, batches: bool = False, row_format: DBXRowFormat = DBXRowFormat.dict) -> tuple['DBXRowIterator | None', Exception | None]:
+        stack = ExitStack()
+        try:
+            conn = stack.enter_context(self.__connection())
+            cur = stack.enter_context(conn.cursor(name=f'dbx_{uuid.uuid4().hex}'))
+            cur.itersize = batch_size
+            if len(vars) > 0:
+                cur.execute(query, vars)
+            else:
+                cur.execute(query)
+        except Exception as err:
+            stack.__exit__(type(err), err, err.__traceback__)
+            return None, err
+
+        return DBXRowIterator(self.__iter_rows(cur, batch_size, batches, row_format), stack), None
+
+    @contextmanager
+    def transaction(self) -> Iterator[DBXTransaction]:
+        with self.__connection() as conn:
+            tx = DBXTransaction(conn, self.__execute, self.__fetches)
+            yield tx
+            if tx.err is not None:
+                conn.rollback()
+
+        if tx.err is None:
+            for query in tx.writes:
+                self.__invalidate(query)
+
+    def invalidate(self, query, vars: list = [], row_format: DBXRowFormat | None = None):
+        # cached rows are keyed by this connection, the cache alone cannot find them
+        if self.__cache is not None:
+            self.__cache.invalidate(query, vars, None if row_format is None else row_format.name, namespace=self.__cache_space)
+
+    def stats(self) -> dict:
+        with self.__stats_lock:
+            stats = dict(self.__stats)
+        if self.__cache is not None:
+            stats['cache'] = self.__cache.stats()
+        return stats
+
+    def close(self):
+        if self.__pool is not None:
+            self.__pool.close()
+
+    @contextmanager
+    def __connection(self) -> Iterator[DBXConnection]:
+        if self.__pool is not None:
+            with self.__pool.connection() as conn:
+                with self.__transaction(conn):
+                    yield conn
+            return
+
+        conn = psycopg2.connect(connection_factory=DBXConnection, **self.__conn)
+        try:
+            with self.__transaction(conn):
+                yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def __transaction(self, conn: DBXConnection) -> Iterator[DBXConnection]:
+        start = conn.dbx_round_trips
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except Exception:
+                    ...
+            raise
+        finally:
+            self.__count(conn.dbx_round_trips - start)
+
+    def __invalidate(self, query):
+        # writes drop the cached reads of the tables they touch
+        if self.__cache is not None and isinstance(query, str):
+            self.__cache.invalidate_query(query)
+
+    def __count(self, round_trips: int):
+        with self.__stats_lock:
+            self.__stats['calls'] += 1
+            self.__stats['round_trips'] += round_trips
+            self.__stats['last_round_trips'] = round_trips
+
+    def __copy_table(self, table: str) -> sql.Composable:
+        return sql.Identifier(*table.split('.'))
+
+    def __copy_columns(self, columns: list[str] | None) -> sql.Composable:
+        if columns is None or len(columns) == 0:
+            return sql.SQL('')
+        return sql.SQL('({})').format(sql.SQL(', ').join([sql.Identifier(col) for col in columns]))
+
+    def __copy_options(self, format: DBXCopyFormat, header: bool) -> sql.Composable:
+        if format == DBXCopyFormat.tsv:
+            return sql.SQL('FORMAT text')
+        return sql.SQL('FORMAT csv, HEADER {}').format(sql.SQL('true' if header else 'false'))
+
+    def __iter_rows(self, cur: any, batch_size: int, batches: bool, row_format: DBXRowFormat) -> Iterator:
+        # the server side cursor holds the result, only one batch lives in memory at a time
+        names: list[str] | None = None
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if len(rows) == 0:
+                return
+
+            if names is None:
+                names = [col.name for col in cur.description]
+
+            # columnar data has no single row shape, it is always yielded per batch
+            items = self.format_rows(names, rows, row_format)
+            if batches or row_format == DBXRowFormat.columnar:
+                yield items
+            else:
+                yield from items
+
+    def __fetches(self, conn: DBXConnection, cur: any, query, vars=[], row_format: DBXRowFormat = DBXRowFormat.dict) -> list | dict:
+        self.__execute(conn, cur, query, vars)
+        names = [col.name for col in cur.description]
+        return self.format_rows(names, cur.fetchall(), row_format)
+
+    def __execute(self, conn: DBXConnection, cur: any, query, vars: list):
+        name = self.__prepared(conn, cur, query, vars)
+        if name is None:
+            if len(vars) > 0:
+                cur.execute(query, vars)
+            else:
+                cur.execute(query)
+            return
+
+        try:
+            if len(vars) > 0:
+                cur.execute(f'EXECUTE {name} ({", ".join(["%s"] * len(vars))})', vars)
+            else:
+                cur.execute(f'EXECUTE {name}')
+        except Exception:
+            # e.g. the plan went stale after a schema change, prepare it again on the next call
+            conn.dbx_state['prepared'].pop(query, None)
+            conn.dbx_state['deallocate'].append(name)
+            raise
+
+    def __prepared(self, conn: DBXConnection, cur: any, query, vars: list) -> str | None:
+        # statements only outlive the call on pooled connections, parameterless calls gain nothing from a plan
+        if self.__pool is None or self.__prepare_size < 1 or not isinstance(query, str) or not isinstance(vars, (list, tuple)) or len(vars) == 0:
+            return None
+
+        state = conn.dbx_state
+        if 'prepared' not in state:
+            state['prepared'] = OrderedDict()
+            state['deallocate'] = []
+            state['sequence'] = 0
+
+        cache: OrderedDict = state['prepared']
+        name = cache.get(query)
+        if name is not None:
+            cache.move_to_end(query)
+            self.__count_prepared('prepared_hits')
+            return name
+
+        # postgres only prepares plannable statements, DDL, SET, COPY and the like run as they are
+        keyword = self.__preparable.match(query)
+        if keyword is None or keyword.group(1).upper() not in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'MERGE', 'VALUES', 'WITH', 'TABLE'):
+            return None
+
+        statement = self.__dollar_params(query, len(vars))
+        if statement is None:
+            return None
+
+        self.__count_prepared('prepared_misses')
+        while len(cache) >= self.__prepare_size:
+            _, evicted = cache.popitem(last=False)
+            state['deallocate'].append(evicted)
+            self.__count_prepared('prepared_evictions')
+
+        for evicted in state['deallocate']:
+            cur.execute(f'DEALLOCATE {evicted}')
+        state['deallocate'].clear()
+
+        state['sequence'] += 1
+        name = f'dbx_p{state["sequence"]}'
+        cur.execute(f'PREPARE {name} AS {statement}')
+        cache[query] = name
+        return name
+
+    def __dollar_params(self, query: str, size: int) -> str | None:
+        # psycopg2 placeholders to server side $n parameters, named placeholders are not supported
+        if '%(' in query:
+            return None
+
+        index = 0
+
+        def replace(match: re.Match) -> str:
+            nonlocal index
+            if match.group() == '%%':
+                return '%'
+            index += 1
+            return f'${index}'
+
+        statement = re.sub(r'%%|%s', replace, query)
+        return statement if index == size else None
+
+    def __count_prepared(self, key: str):
+        with self.__stats_lock:
+            self.__stats[key] += 1
+
+    @staticmethod
+    def format_columns(description: list, rows: list[tuple], arrow: bool = False) -> dict | Any:
+        # straight from driver tuples to columns, no per row dict
+        values = list(zip(*rows)) if len(rows) > 0 else [() for _ in description]
+        if arrow:
+            return dbx_arrow_table(description, values)
+        return dbx_numpy_columns(description, values)
+
+    @staticmethod
+    def format_rows(names: list[str], rows: list[tuple], row_format: DBXRowFormat = DBXRowFormat.dict) -> list | dict:
+        match row_format:
+            case DBXRowFormat.tuple:
+                return rows
+
+            case DBXRowFormat.namedtuple:
+                key = tuple(names)
+                row_class = DBX.__row_classes.get(key)
+                if row_class is None:
+                    row_class = namedtuple('DBXRow', names, rename=True)
+                    DBX.__row_classes[key] = row_class
+                return [row_class._make(row) for row in rows]
+
+            case DBXRowFormat.columnar:
+                if len(rows) == 0:
+                    return {name: [] for name in names}
+                return {name: list(values) for name, values in zip(names, zip(*rows))}
+
+        return [dict(zip(names, row)) for row in rows]
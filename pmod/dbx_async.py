@@ -0,0 +1,258 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+import time
+import asyncio
+import psycopg2
+import psycopg2.extensions
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+from pmod.dbx import DBX, DBXConnection, DBXRowFormat, dbx_conn_options
+
+
+async def dbx_wait(conn: DBXConnection):
+    # drive the libpq state machine of an async connection from the running event loop
+    loop = asyncio.get_running_loop()
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+
+        fd = conn.fileno()
+        fut = loop.create_future()
+
+        def ready():
+            if not fut.done():
+                fut.set_result(None)
+
+        if state == psycopg2.extensions.POLL_READ:
+            loop.add_reader(fd, ready)
+            try:
+                await fut
+            finally:
+                loop.remove_reader(fd)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            loop.add_writer(fd, ready)
+            try:
+                await fut
+            finally:
+                loop.remove_writer(fd)
+        else:
+            raise psycopg2.OperationalError(f'unexpected poll state: {state}')
+
+
+class AsyncDBXPool:
+    __conn        : dict         = {}
+    __min_size    : int          = 1
+    __max_size    : int          = 10
+    __idle_timeout: float        = 300
+    __check_after : float        = 30
+    __on_connect  : Callable[[DBXConnection], Awaitable[None]] | None = None
+
+    def __init__(self, conn: dict, min_size: int = 1, max_size: int = 10, idle_timeout: float = 300, check_after: float = 30, on_connect: Callable[[DBXConnection], Awaitable[None]] | None = None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f'invalid pool size, min: {min_size}, max: {max_size}')
+
+        self.__conn = conn
+        self.__min_size = min_size
+        self.__max_size = max_size
+        self.__idle_timeout = idle_timeout
+        self.__check_after = check_after
+        self.__on_connect = on_connect
+
+        self.__cond = asyncio.Condition()
+        self.__idle: list[DBXConnection] = []
+        self.__size = 0
+        self.__closed = False
+
+    async def getconn(self) -> DBXConnection:
+        while True:
+            conn = await self.__checkout()
+            if conn is None:
+                return await self.__open()
+
+            if await self.__healthy(conn):
+                return conn
+
+            await self.putconn(conn, discard=True)
+
+    async def putconn(self, conn: DBXConnection, discard: bool = False):
+        async with self.__cond:
+            if discard or conn.closed or self.__closed:
+                self.__size -= 1
+                self.__close(conn)
+            else:
+                conn.dbx_last_used = time.monotonic()
+                self.__idle.append(conn)
+            self.__cond.notify()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[DBXConnection]:
+        conn = await self.getconn()
+        try:
+            yield conn
+        except BaseException:
+            # a cancelled query leaves the connection busy, never hand it out again
+            await self.putconn(conn, discard=conn.closed != 0 or conn.isexecuting())
+            raise
+        else:
+            await self.putconn(conn)
+
+    async def close(self):
+        async with self.__cond:
+            self.__closed = True
+            for conn in self.__idle:
+                self.__close(conn)
+            self.__size -= len(self.__idle)
+            self.__idle.clear()
+            self.__cond.notify_all()
+
+    async def __checkout(self) -> DBXConnection | None:
+        async with self.__cond:
+            while True:
+                if self.__closed:
+                    raise psycopg2.InterfaceError('connection pool is closed')
+
+                self.__evict_idle()
+
+                if len(self.__idle) > 0:
+                    return self.__idle.pop()
+
+                if self.__size < self.__max_size:
+                    self.__size += 1
+                    return None
+
+                await self.__cond.wait()
+
+    async def __open(self) -> DBXConnection:
+        try:
+            conn = psycopg2.connect(connection_factory=DBXConnection, async_=True, **self.__conn)
+            await dbx_wait(conn)
+            if self.__on_connect is not None:
+                await self.__on_connect(conn)
+            return conn
+        except BaseException:
+            async with self.__cond:
+                self.__size -= 1
+                self.__cond.notify()
+            raise
+
+    async def __healthy(self, conn: DBXConnection) -> bool:
+        if conn.closed:
+            return False
+
+        if time.monotonic() - conn.dbx_last_used < self.__check_after:
+            return True
+
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            await dbx_wait(conn)
+            cur.close()
+            return True
+        except Exception:
+            return False
+
+    def __evict_idle(self):
+        now = time.monotonic()
+        while len(self.__idle) > 0 and self.__size > self.__min_size and now - self.__idle[0].dbx_last_used > self.__idle_timeout:
+            self.__close(self.__idle.pop(0))
+            self.__size -= 1
+
+    def __close(self, conn: DBXConnection):
+        try:
+            conn.close()
+        except Exception:
+            ...
+
+
+class AsyncDBX:
+    __conn : dict                 = {}
+    __pool : AsyncDBXPool | None  = None
+    __stats: dict                 = {}
+
+    def __init__(self, name: str|None = None, host: str|None = None, port: str|None = None, usr: str|None = None, pwd: str|None = None, tz: str|None = None, kv: dict|None = None, prefix: str|None = None,
+                 pool_min: int = 1, pool_max: int = 10, pool_idle_timeout: float = 300):
+        if kv is not None and prefix is not None:
+            name = kv[f'{prefix}_NAME']
+            host = kv[f'{prefix}_HOST']
+            port = kv[f'{prefix}_PORT']
+            usr  = kv[f'{prefix}_USER']
+            pwd  = kv[f'{prefix}_PASS']
+            tz   = kv[f'{prefix}_TZ']
+
+        self.__conn = {
+            'database': name,
+            'host'    : host,
+            'port'    : port,
+            'user'    : usr,
+            'password': pwd,
+        }
+
+        if tz is not None:
+            self.__conn['options'] = dbx_conn_options(tz)
+
+        self.__stats = {'calls': 0, 'round_trips': 0, 'last_round_trips': 0}
+        self.__pool = AsyncDBXPool(self.__conn, min_size=pool_min, max_size=pool_max, idle_timeout=pool_idle_timeout)
+
+    async def fetches(self, query, vars: list = [], row_format: DBXRowFormat = DBXRowFormat.dict) -> tuple[list | dict | None, Exception | None]:
+        try:
+            async with self.__pool.connection() as conn:
+                cur = await self.__execute(conn, query, vars)
+                try:
+                    names = [col.name for col in cur.description]
+                    return DBX.format_rows(names, cur.fetchall(), row_format), None
+                finally:
+                    cur.close()
+        except Exception as err:
+            return None, err
+
+    async def exec(self, query, vars: list = []) -> Exception | None:
+        try:
+            async with self.__pool.connection() as conn:
+                cur = await self.__execute(conn, query, vars)
+                cur.close()
+        except Exception as err:
+            return err
+
+    async def gather_fetches(self, queries: list[str | tuple[str, list]], row_format: DBXRowFormat = DBXRowFormat.dict) -> list[tuple[list | dict | None, Exception | None]]:
+        # every query checks out its own pooled connection, the pool max size caps the fan-out
+        tasks = []
+        for item in queries:
+            query, vars = (item, []) if isinstance(item, str) else item
+            tasks.append(self.fetches(query, vars, row_format))
+        return list(await asyncio.gather(*tasks))
+
+    def stats(self) -> dict:
+        return dict(self.__stats)
+
+    async def close(self):
+        if self.__pool is not None:
+            await self.__pool.close()
+
+    async def __execute(self, conn: DBXConnection, query, vars: list) -> any:
+        cur = conn.cursor()
+        start = conn.dbx_round_trips
+        try:
+            if len(vars) > 0:
+                cur.execute(query, vars)
+            else:
+                cur.execute(query)
+            await dbx_wait(conn)
+            return cur
+        except BaseException:
+            cur.close()
+            raise
+        finally:
+            # async connections run in autocommit, the statement is the whole call
+            round_trips = conn.dbx_round_trips - start
+            self.__stats['calls'] += 1
+            self.__stats['round_trips'] += round_trips
+            self.__stats['last_round_trips'] = round_trips
@@ -0,0 +1,240 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+import os
+import re
+import json
+import time
+import pickle
+import hashlib
+import tempfile
+import threading
+from typing import Any
+from collections import OrderedDict
+
+
+class DBXCache:
+    __ttl        : float       = 300
+    __max_entries: int         = 1024
+    __max_bytes  : int         = 64 * 1024 * 1024
+    __path       : str | None  = None
+
+    __read_tables  = re.compile(r'\b(?:FROM|JOIN)\s+([\w."]+)', re.IGNORECASE)
+    __write_tables = re.compile(r'\b(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?|ALTER\s+TABLE|DROP\s+TABLE(?:\s+IF\s+EXISTS)?|COPY)\s+([\w."]+)', re.IGNORECASE)
+
+    def __init__(self, ttl: float = 300, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, path: str | None = None):
+        self.__ttl = ttl
+        self.__max_entries = max_entries
+        self.__max_bytes = max_bytes
+        self.__path = path
+
+        # key → (expires_at, tags, pickled value), values are stored pickled so callers never share a cached object
+        self.__entries: OrderedDict[str, tuple[float, list[str], bytes]] = OrderedDict()
+        self.__bytes = 0
+        self.__lock = threading.Lock()
+        self.__stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'disk_hits': 0}
+
+        # values on disk are unpickled when read, the directory must be private to the user running it
+        if path is not None:
+            os.makedirs(path, mode=0o700, exist_ok=True)
+            info = os.stat(path)
+            if info.st_uid != os.getuid() or info.st_mode & 0o022:
+                raise PermissionError(f'cache path {path} must be owned by the current user and not writable by others')
+
+    def get(self, query: str, vars: list = [], variant: str = '', namespace: str = '') -> tuple[Any, bool]:
+        key = self.__key(query, vars, variant, namespace)
+        if key is None:
+            return None, False
+
+        now = time.time()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self.__drop(key)
+                self.__stats['expired'] += 1
+                entry = None
+
+            if entry is not None:
+                self.__entries.move_to_end(key)
+                self.__stats['hits'] += 1
+                return pickle.loads(entry[2]), True
+
+        entry = self.__disk_read(key, now)
+        if entry is None:
+            with self.__lock:
+                self.__stats['misses'] += 1
+            return None, False
+
+        with self.__lock:
+            self.__put(key, entry)
+            self.__stats['hits'] += 1
+            self.__stats['disk_hits'] += 1
+        return pickle.loads(entry[2]), True
+
+    def set(self, query: str, vars: list, value: Any, variant: str = '', tags: list[str] | None = None, ttl: float | None = None, namespace: str = '') -> bool:
+        key = self.__key(query, vars, variant, namespace)
+        if key is None:
+            return False
+
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+
+        if len(blob) > self.__max_bytes:
+            return False
+
+        tags = [tag.lower() for tag in (tags if tags is not None else self.tables(query))]
+        entry = (time.time() + (self.__ttl if ttl is None else ttl), tags, blob)
+
+        with self.__lock:
+            self.__put(key, entry)
+
+        self.__disk_write(key, entry)
+        return True
+
+    def invalidate(self, query: str, vars: list = [], variant: str | None = None, namespace: str = ''):
+        if variant is not None:
+            key = self.__key(query, vars, variant, namespace)
+            keys = [] if key is None else [key]
+        else:
+            # without a variant every cached shape of the same query goes
+            prefix = self.__key(query, vars, '', namespace)
+            with self.__lock:
+                keys = [] if prefix is None else [key for key in self.__entries if key.startswith(prefix)]
+            keys += [] if prefix is None else [key for key in self.__disk_keys() if key.startswith(prefix) and key not in keys]
+
+        with self.__lock:
+            for key in keys:
+                self.__drop(key)
+
+        for key in keys:
+            self.__disk_remove(key)
+
+    def invalidate_tag(self, *tags: str):
+        tags = {tag.lower() for tag in tags}
+
+        with self.__lock:
+            keys = [key for key, entry in self.__entries.items() if tags.intersection(entry[1])]
+            for key in keys:
+                self.__drop(key)
+
+        for key in self.__disk_keys():
+            header = self.__disk_header(key)
+            if header is not None and tags.intersection(header['tags']):
+                self.__disk_remove(key)
+
+    def invalidate_query(self, query: str):
+        tables = self.tables(query, write=True)
+        if len(tables) > 0:
+            self.invalidate_tag(*tables)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
+
+        for key in self.__disk_keys():
+            self.__disk_remove(key)
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {**self.__stats, 'entries': len(self.__entries), 'bytes': self.__bytes}
+
+    def tables(self, query: str, write: bool = False) -> list[str]:
+        pattern = self.__write_tables if write else self.__read_tables
+        tables = []
+        for name in pattern.findall(query):
+            name = name.replace('"', '').lower()
+            if name not in tables:
+                tables.append(name)
+            # a schema qualified name also answers to its bare table name
+            if '.' in name and name.split('.')[-1] not in tables:
+                tables.append(name.split('.')[-1])
+        return tables
+
+    def __key(self, query: str, vars: list, variant: str, namespace: str) -> str | None:
+        # the namespace keeps the same query against different databases (stg, prod) apart
+        try:
+            digest = hashlib.sha256(pickle.dumps((namespace, query, list(vars)), protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+        except Exception:
+            return None
+        return f'{digest}.{variant}'
+
+    def __put(self, key: str, entry: tuple[float, list[str], bytes]):
+        self.__drop(key)
+        self.__entries[key] = entry
+        self.__bytes += len(entry[2])
+
+        while len(self.__entries) > self.__max_entries or self.__bytes > self.__max_bytes:
+            oldest = next(iter(self.__entries))
+            self.__drop(oldest)
+            self.__stats['evictions'] += 1
+
+    def __drop(self, key: str):
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.__bytes -= len(entry[2])
+
+    def __disk_file(self, key: str) -> str:
+        return os.path.join(self.__path, f'{key}.cache')
+
+    def __disk_keys(self) -> list[str]:
+        if self.__path is None:
+            return []
+        return [name[:-len('.cache')] for name in os.listdir(self.__path) if name.endswith('.cache')]
+
+    def __disk_header(self, key: str) -> dict | None:
+        try:
+            with open(self.__disk_file(key), 'rb') as file:
+                return json.loads(file.readline())
+        except Exception:
+            return None
+
+    def __disk_read(self, key: str, now: float) -> tuple[float, list[str], bytes] | None:
+        if self.__path is None:
+            return None
+
+        try:
+            with open(self.__disk_file(key), 'rb') as file:
+                header = json.loads(file.readline())
+                if header['expires_at'] <= now:
+                    self.__disk_remove(key)
+                    return None
+                return header['expires_at'], header['tags'], file.read()
+        except Exception:
+            return None
+
+    def __disk_write(self, key: str, entry: tuple[float, list[str], bytes]):
+        if self.__path is None:
+            return
+
+        # one json header line then the pickled value, tag scans only read the header
+        header = json.dumps({'expires_at': entry[0], 'tags': entry[1]}).encode() + b'\n'
+        fd, tmp_path = tempfile.mkstemp(dir=self.__path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(header)
+                file.write(entry[2])
+            os.replace(tmp_path, self.__disk_file(key))
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                ...
+
+    def __disk_remove(self, key: str):
+        if self.__path is None:
+            return
+
+        try:
+            os.remove(self.__disk_file(key))
+        except FileNotFoundError:
+            ...
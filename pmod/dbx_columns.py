@@ -0,0 +1,80 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+from datetime import timezone
+from typing import Any
+
+
+# postgres type oid → (numpy dtype, arrow type name)
+DBX_COLUMN_TYPES: dict[int, tuple[str, str]] = {
+    16  : ('bool',           'bool_'),
+    20  : ('int64',          'int64'),
+    21  : ('int16',          'int16'),
+    23  : ('int32',          'int32'),
+    700 : ('float32',        'float32'),
+    701 : ('float64',        'float64'),
+    1700: ('float64',        ''),
+    1082: ('datetime64[D]',  'date32'),
+    1114: ('datetime64[us]', 'timestamp'),
+    1184: ('datetime64[us]', 'timestamptz'),
+    25  : ('object',         'string'),
+    1043: ('object',         'string'),
+    1042: ('object',         'string'),
+}
+
+
+def dbx_numpy_columns(description: list, values: list[tuple]) -> dict[str, Any]:
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError('numpy is required for fetch_columns, pip install numpy')
+
+    columns = {}
+    for col, items in zip(description, values):
+        dtype, _ = DBX_COLUMN_TYPES.get(col.type_code, ('object', ''))
+
+        if col.type_code == 1184:
+            # numpy datetimes are naive, keep the instant as utc
+            items = [None if item is None else item.astimezone(timezone.utc).replace(tzinfo=None) for item in items]
+
+        if dtype.startswith(('int', 'float', 'bool')) and None in items:
+            # nulls have no integer or boolean representation, degrade the column
+            dtype = 'object' if dtype == 'bool' else 'float64'
+            if dtype == 'float64':
+                items = [np.nan if item is None else item for item in items]
+
+        columns[col.name] = np.array(items, dtype=dtype)
+
+    return columns
+
+
+def dbx_arrow_table(description: list, values: list[tuple]) -> Any:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError('pyarrow is required for fetch_columns(arrow=True), pip install pyarrow')
+
+    arrays = []
+    for col, items in zip(description, values):
+        _, type_name = DBX_COLUMN_TYPES.get(col.type_code, ('object', ''))
+
+        match type_name:
+            case '':
+                arrow_type = None
+            case 'timestamp':
+                arrow_type = pa.timestamp('us')
+            case 'timestamptz':
+                arrow_type = pa.timestamp('us', tz='UTC')
+            case _:
+                arrow_type = getattr(pa, type_name)()
+
+        arrays.append(pa.array(items, type=arrow_type))
+
+    return pa.Table.from_arrays(arrays, names=[col.name for col in description])
@@ -8,24 +8,50 @@ licenses restricting copying, distribution and decompilation.
 All Rights Reserved.
 '''
 
+from __future__ import annotations
+
+import os
+import re
 import json
-import rich
-import requests
-import jsonpickle
 import sys
+import time
+import queue
+import functools
+import threading
+import contextlib
 from enum import Enum
-from pygments import highlight
-from pygments.lexers import get_lexer_by_name
-from pygments.formatters import TerminalFormatter
-from dotenv import dotenv_values
-from typing import cast, TypeVar, Callable, Coroutine, Generic
-from unsync import unsync
-from grpclib.client import Channel
+from pmod.ext import get_env as get_env  # re-exported, scripts call eval.get_env
+from typing import cast, TYPE_CHECKING, TypeVar, AsyncIterator, Callable, Coroutine, Generic, Iterable, Iterator
+
+# asyncio, requests, rich, jsonpickle, pygments, unsync and grpclib are imported where they are used,
+# a script that only reads an env file does not pay for them
+if TYPE_CHECKING:
+    import requests
+    from grpclib.client import Channel
+    from pmod.bench import BenchReport
 
 
 T = TypeVar("T")
 Y = TypeVar("Y")
 
+# printers skip syntax highlighting for output larger than this many characters
+PRINT_HIGHLIGHT_LIMIT = 256 * 1024
+
+
+def _unsync(func):
+    # same as @unsync, but unsync (and its event loop thread) only starts on the first call
+    wrapped = None
+
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        nonlocal wrapped
+        if wrapped is None:
+            from unsync import unsync
+            wrapped = unsync(func)
+        return wrapped(*args, **kwargs)
+
+    return call
+
 
 class HttpStyle(Enum):
     hidden       = -1
@@ -33,68 +59,269 @@ class HttpStyle(Enum):
     content_only = 2
 
 
-def get_env(*args) -> dict:
-    env = {}
-    for arg in args:
-        env.update(dotenv_values(arg))
-    return env
+class StreamFormat(Enum):
+    raw    = 1
+    ndjson = 2
+    sse    = 3
+
+
+class HttpRequest:
+    url   : str                   = ''
+    method: str                   = 'get'
+    header: dict[str, str] | None = None
+    body  : any                   = None
+    files : any                   = None
+    params: any                   = None
+
+    def __init__(self, url: str, method: str = 'get', header: dict[str, str] | None = None, body: any = None, files: any = None, params: any = None):
+        self.url = url
+        self.method = method.lower()
+        self.header = header
+        self.body = body
+        self.files = files
+        self.params = params
+
+
+class HttpClient:
+    timeout     : float | tuple[float, float] | None = None
+    pool_maxsize: int                                = 10
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, host_pool_sizes: dict[str, int] | None = None, retries: int = 3, backoff: float = 0.3,
+                 retry_status: list[int] = [429, 502, 503, 504], timeout: float | tuple[float, float] | None = (10, 120)):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.session = requests.Session()
+
+        # only idempotent methods are retried, the last response is returned instead of raising
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=retry_status, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # e.g. {'https://api.example.com': 50}, the longest matching prefix wins
+        for prefix, size in (host_pool_sizes or {}).items():
+            self.session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=retry))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+__http_client: HttpClient | None = None
+__http_client_lock = threading.Lock()
+# pool size → client, for callers running more threads than the shared pool holds; kept so later calls reuse the connections
+__http_clients_sized: dict[int, HttpClient] = {}
+
+
+def http_client() -> HttpClient:
+    global __http_client
+    if __http_client is None:
+        with __http_client_lock:
+            if __http_client is None:
+                __http_client = HttpClient()
+    return __http_client
+
+
+def set_http_client(client: HttpClient | None = None, **kwargs) -> HttpClient:
+    global __http_client
+    with __http_client_lock:
+        if __http_client is not None:
+            __http_client.close()
+        for sized in __http_clients_sized.values():
+            sized.close()
+        __http_clients_sized.clear()
+        __http_client = client if client is not None else HttpClient(**kwargs)
+    return __http_client
+
+
+def __http_client_sized(size: int) -> HttpClient:
+    client = http_client()
+    if size <= client.pool_maxsize:
+        return client
+
+    with __http_client_lock:
+        sized = __http_clients_sized.get(size)
+        if sized is None:
+            sized = HttpClient(pool_maxsize=size, timeout=client.timeout)
+            __http_clients_sized[size] = sized
+        return sized
 
 
 def replace_env_value(file_path: str, key: str, value: str, print_rewrite: bool = False):
-    index = -1
-    lines = []
+    replace_env_values(file_path, {key: value}, print_rewrite=print_rewrite)
+
 
-    with open(file_path, 'r', encoding='utf-8') as file:
-        lines = file.readlines()
+def replace_env_values(file_path: str, values: dict[str, str], print_rewrite: bool = False, lock: bool = True) -> list[str]:
+    # one parse, exact key matches, one atomic write; keys missing from the file are left out, as before
+    with __env_lock(file_path, lock):
+        with open(file_path, 'r', encoding='utf-8') as file:
+            lines = file.readlines()
+
+        # key → every line that assigns it, `export KEY=` keeps its prefix
+        index: dict[str, list[int]] = {}
         for i, line in enumerate(lines):
-            if key in line:
-                index = i
-                break
+            match = __env_line.match(line)
+            if match is not None:
+                index.setdefault(match.group(2), []).append(i)
+
+        replaced = [key for key in values if key in index]
+        if len(replaced) == 0:
+            return replaced
 
-    if index != -1:
-        lines[index] = f'{key}={value}\n'
-        with open(file_path, 'w', encoding='utf-8') as file:
-            file.writelines(lines)
-            if print_rewrite:
-                print('rewrite')
+        for key in replaced:
+            for i in index[key]:
+                lines[i] = f'{__env_line.match(lines[i]).group(1)}{key}={values[key]}\n'
+
+        __write_atomic(file_path, ''.join(lines))
+        if print_rewrite:
+            print('rewrite')
+        return replaced
 
 
 def get(url: str, style: HttpStyle = HttpStyle.hidden, header: dict[str, str] | None = None, params: any = None):
-    req = requests.get(url, headers=header, params=params)
+    req = http_client().request('get', url, headers=header, params=params)
     __show('get', req, style)
     return req.status_code, req.text
 
 
 def post(url: str, style: HttpStyle = HttpStyle.hidden, header: dict[str, str] | None = None, body: any = None, files: any = None, params: any = None):
-    req = requests.post(url, headers=header, json=body, files=files, params=params)
+    req = http_client().request('post', url, headers=header, json=body, files=files, params=params)
     __show('post', req, style)
     return req.status_code, req.text
 
 
 def put(url: str, style: HttpStyle = HttpStyle.hidden, header: dict[str, str] | None = None, body: any = None, files: any = None, params: any = None):
-    req = requests.put(url, headers=header, json=body, files=files, params=params)
+    req = http_client().request('put', url, headers=header, json=body, files=files, params=params)
     __show('put', req, style)
     return req.status_code, req.text
 
 
 def path(url: str, style: HttpStyle = HttpStyle.hidden, header: dict[str, str] | None = None, body: any = None, files: any = None, params: any = None):
-    req = requests.patch(url, headers=header, json=body, files=files, params=params)
+    req = http_client().request('patch', url, headers=header, json=body, files=files, params=params)
     __show('patch', req, style)
     return req.status_code, req.text
 
 
 def delete(url: str, style: HttpStyle = HttpStyle.hidden, header: dict[str, str] | None = None, params: any = None):
-    req = requests.delete(url, headers=header, params=params)
+    req = http_client().request('delete', url, headers=header, params=params)
     __show('delete', req, style)
     return req.status_code, req.text
 
 
+def batch(reqs: list[HttpRequest | str], concurrency: int = 10, style: HttpStyle = HttpStyle.hidden) -> tuple[list[tuple[int, str]], list[float]]:
+    reqs = [HttpRequest(req) if isinstance(req, str) else req for req in reqs]
+    results: list[tuple[int, str]] = []
+    timings: list[float] = []
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    # more workers than pooled connections would open and discard a connection per request
+    client = __http_client_sized(concurrency)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [executor.submit(__timed_request, client, req) for req in reqs]
+
+        # collected in request order, printing stays readable while later requests still run
+        for req, future in zip(reqs, futures):
+            res, err, elapsed = future.result()
+            timings.append(elapsed)
+
+            if err is not None:
+                results.append((0, str(err)))
+                if style != HttpStyle.hidden:
+                    import rich
+                    print(f'0: {req.method} {req.url} ({elapsed * 1000:.1f} ms)\n')
+                    rich.print(str(err))
+                continue
+
+            results.append((res.status_code, res.text))
+            __show(req.method, res, style)
+
+    return results, timings
+
+
+def load(url: str, method: str = 'get', rps: float | None = None, concurrency: int = 10, duration: float = 10, header: dict[str, str] | None = None, body: any = None, params: any = None,
+         as_json: bool = False, show: bool = True) -> BenchReport:
+    # a dedicated client, sized to the concurrency and without retries so the numbers are not smoothed
+    client = HttpClient(pool_connections=1, pool_maxsize=max(1, concurrency), retries=0)
+    req = HttpRequest(url, method=method, header=header, body=body, params=params)
+
+    try:
+        report = __load(client, req, rps, concurrency, duration).result()
+    finally:
+        client.close()
+
+    if show:
+        if as_json:
+            print(report.to_json())
+        else:
+            report.print()
+
+    return report
+
+
+def iter_stream(url: str, method: str = 'get', format: StreamFormat = StreamFormat.ndjson, header: dict[str, str] | None = None, body: any = None, params: any = None,
+                chunk_size: int = 65536) -> tuple[int, Iterator]:
+    res = http_client().request(method, url, headers=header, json=body, params=params, stream=True)
+    items = __iter_response(res, format, chunk_size)
+    if format == StreamFormat.ndjson:
+        items = (json.loads(line) for line in items)
+    return res.status_code, items
+
+
+def stream(url: str, method: str = 'get', format: StreamFormat = StreamFormat.ndjson, style: HttpStyle = HttpStyle.content_only, header: dict[str, str] | None = None, body: any = None, params: any = None,
+           output: str | None = None, chunk_size: int = 65536) -> tuple[int, int]:
+    res = http_client().request(method, url, headers=header, json=body, params=params, stream=True)
+    size = 0
+
+    if style in [HttpStyle.with_header, HttpStyle.content_only]:
+        print(f'{res.status_code}: {method} {res.url}\n')
+    if style == HttpStyle.with_header:
+        print_json(json.dumps(dict(res.headers)))
+
+    # straight to disk, chunk by chunk, nothing is decoded or kept
+    if output is not None:
+        with open(output, 'wb') as file:
+            for chunk in __iter_response(res, StreamFormat.raw, chunk_size):
+                file.write(chunk)
+                size += len(chunk)
+        return res.status_code, size
+
+    for item in __iter_response(res, format, chunk_size):
+        match format:
+            case StreamFormat.raw:
+                size += len(item)
+                if style != HttpStyle.hidden:
+                    sys.stdout.write(item.decode(res.encoding or 'utf-8', errors='replace'))
+                    sys.stdout.flush()
+
+            case StreamFormat.ndjson:
+                size += 1
+                if style != HttpStyle.hidden:
+                    print_json(item)
+
+            case StreamFormat.sse:
+                size += 1
+                if style != HttpStyle.hidden:
+                    print(f'event: {item["event"]}' + (f', id: {item["id"]}' if item['id'] is not None else ''))
+                    print_json(item['data'])
+
+    return res.status_code, size
+
+
 def print_json(val: str):
     try:
-        json_object = json.loads(val)
-        json_str = json.dumps(json_object, indent=2, sort_keys=True)
-        print(highlight(json_str, get_lexer_by_name("json"), TerminalFormatter()))
+        json_object = __json_loads(val)
+        __print_highlighted(__json_dumps(json_object), 'json')
     except Exception as _:
+        import rich
         try:
             rich.print_json(val)
         except Exception as _:
@@ -103,14 +330,16 @@ def print_json(val: str):
 
 def print_object(obj, removeKeysStartingWith: str | None = None):
     try:
-        json_string = jsonpickle.encode(obj, unpicklable=False)
-        json_object = json.loads(json_string)
+        import jsonpickle
+
+        # flatten straight to json-ready values, no encode then parse round trip
+        json_object = jsonpickle.pickler.Pickler(unpicklable=False).flatten(obj)
         if removeKeysStartingWith is not None:
             json_object = __remove_keys_starting_with(json_object, removeKeysStartingWith)
 
-        json_str = json.dumps(json_object, indent=2, sort_keys=True)
-        print(highlight(json_str, get_lexer_by_name("make"), TerminalFormatter()))
+        __print_highlighted(__json_dumps(json_object), 'make')
     except Exception as _:
+        import rich
         try:
             rich.print_json(obj)
         except Exception as _:
@@ -118,7 +347,7 @@ def print_object(obj, removeKeysStartingWith: str | None = None):
 
 
 def print_make(val: str):
-    print(highlight(val, get_lexer_by_name("make"), TerminalFormatter()))
+    __print_highlighted(val, 'make')
 
 
 def __show(http_method: str, response: requests.Response, style: HttpStyle):
@@ -133,6 +362,172 @@ def __show(http_method: str, response: requests.Response, style: HttpStyle):
             print_json(response.text)
 
 
+def __timed_request(client: HttpClient, req: HttpRequest) -> tuple[requests.Response | None, Exception | None, float]:
+    start = time.perf_counter()
+    try:
+        res = client.request(req.method, req.url, headers=req.header, json=req.body, files=req.files, params=req.params)
+        return res, None, time.perf_counter() - start
+    except Exception as err:
+        return None, err, time.perf_counter() - start
+
+
+@_unsync
+async def __load(client: HttpClient, req: HttpRequest, rps: float | None, concurrency: int, duration: float) -> BenchReport:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from pmod.bench import bench_run
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+
+    def send() -> requests.Response:
+        return client.request(req.method, req.url, headers=req.header, json=req.body, params=req.params)
+
+    async def call() -> tuple[str, bool]:
+        res = await loop.run_in_executor(executor, send)
+        return str(res.status_code), res.status_code < 400
+
+    try:
+        return await bench_run(f'{req.method.upper()} {req.url}', call, concurrency=concurrency, rps=rps, duration=duration)
+    finally:
+        executor.shutdown(wait=False)
+
+
+def __iter_response(res: requests.Response, format: StreamFormat, chunk_size: int) -> Iterator:
+    try:
+        match format:
+            case StreamFormat.raw:
+                yield from res.iter_content(chunk_size=chunk_size)
+
+            case StreamFormat.ndjson:
+                for line in res.iter_lines(chunk_size=chunk_size):
+                    if line.strip():
+                        yield line.decode('utf-8')
+
+            case StreamFormat.sse:
+                event, data, event_id = 'message', [], None
+                for line in res.iter_lines(chunk_size=chunk_size):
+                    line = line.decode('utf-8')
+                    if line == '':
+                        if len(data) > 0:
+                            yield {'event': event, 'data': '\n'.join(data), 'id': event_id}
+                        event, data = 'message', []
+                        continue
+
+                    if line.startswith(':'):
+                        continue
+
+                    field, _, value = line.partition(':')
+                    value = value[1:] if value.startswith(' ') else value
+                    match field:
+                        case 'event':
+                            event = value
+                        case 'data':
+                            data.append(value)
+                        case 'id':
+                            event_id = value
+
+                if len(data) > 0:
+                    yield {'event': event, 'data': '\n'.join(data), 'id': event_id}
+    finally:
+        res.close()
+
+
+__env_line = re.compile(r'^(\s*(?:export\s+)?)([A-Za-z_][A-Za-z0-9_.-]*)\s*=')
+
+
+@contextlib.contextmanager
+def __env_lock(file_path: str, lock: bool) -> Iterator[None]:
+    # a lock file keyed by the env file's real path, the env file itself is swapped by rename so its inode
+    # cannot carry the lock; it lives in the user's runtime (or temp) dir, never next to the env file in a checkout
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+
+    if not lock or fcntl is None:
+        yield
+        return
+
+    import hashlib
+    import tempfile
+
+    digest = hashlib.sha256(os.path.realpath(file_path).encode()).hexdigest()[:32]
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    lock_path = os.path.join(directory, f'pmod-env-{os.getuid()}-{digest}.lock')
+    with os.fdopen(os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_NOFOLLOW', 0), 0o600), 'a') as file:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+def __write_atomic(file_path: str, content: str):
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(tmp_path, os.stat(file_path).st_mode & 0o7777)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            ...
+        raise
+
+
+def __orjson():
+    try:
+        import orjson
+        return orjson
+    except ImportError:
+        return None
+
+
+def __json_loads(val: str | bytes):
+    # orjson turns integers past 64 bit into floats, a debug printer must show the exact value
+    orjson = __orjson()
+    if orjson is None or (__json_long_digits if isinstance(val, str) else __json_long_digits_bytes).search(val) is not None:
+        return json.loads(val)
+    try:
+        return orjson.loads(val)
+    except orjson.JSONDecodeError:
+        return json.loads(val)
+
+
+__json_long_digits = re.compile(r'\d{19,}')
+__json_long_digits_bytes = re.compile(rb'\d{19,}')
+
+
+def __json_dumps(obj) -> str:
+    orjson = __orjson()
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            # out of range integers and the like, let the stdlib have a go
+            ...
+    return json.dumps(obj, indent=2, sort_keys=True)
+
+
+def __print_highlighted(val: str, lexer: str):
+    # pygments stalls the terminal on multi MB payloads and only adds escape codes to a pipe
+    if len(val) > PRINT_HIGHLIGHT_LIMIT or not sys.stdout.isatty():
+        print(val + '\n')
+    else:
+        from pygments import highlight
+        from pygments.lexers import get_lexer_by_name
+        from pygments.formatters import TerminalFormatter
+        print(highlight(val, get_lexer_by_name(lexer), TerminalFormatter()))
+
+
 def __remove_keys_starting_with(data, prefix):
     if isinstance(data, dict):
         keys_to_remove = [key for key in data if key.startswith(prefix)]
@@ -147,23 +542,218 @@ def __remove_keys_starting_with(data, prefix):
 
 
 class GrpcClient(Generic[Y]):
-    def __init__(self, url: str, stub: Y):
+    def __init__(self, url: str, stub: Y, channels: int = 1):
         self.host = url.split(':')[0]
         self.port = int(url.split(':')[1])
         self.stub = stub
 
-    def call(self, type: T, func: Callable[[Y], Coroutine]) -> T:
+        # long lived channels, connected lazily and shared round robin, rpcs multiplex over http/2
+        self.__channels: list[Channel | None] = [None] * max(1, channels)
+        self.__services: list[Y | None] = [None] * max(1, channels)
+        self.__next = 0
+
+        from pmod.bench import LatencyHistogram
+        self.__latency = LatencyHistogram()
+        self.__first_message = LatencyHistogram()
+        self.__stats = {'calls': 0, 'errors': 0, 'reconnects': 0, 'streams': 0, 'messages': 0}
+
+    def __enter__(self) -> 'GrpcClient[Y]':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def call(self, type: T, func: Callable[[Y], Coroutine], timeout: float | None = None) -> T:
         try:
-            res = self.__exec(func).result()
+            res = self.__exec(func, timeout).result()
             return cast(type, res)
         except Exception as e:
             message = str(e)
             sys.exit('unable to connect to grpc server' if 'Connect call failed' in message else message)
 
-    @unsync
-    async def __exec(self, call: Callable[[Y], Coroutine]):
-        channel = Channel(host=self.host, port=self.port, ssl=self.port == 443)
-        service = self.stub(channel=channel)
-        res = await call(service)
-        channel.close()
-        return res
+    def call_many(self, type: T, funcs: list[Callable[[Y], Coroutine]], concurrency: int = 10, timeout: float | None = None) -> list[tuple[T | None, Exception | None]]:
+        # results keep the order of funcs, a failed call does not stop the others
+        return self.__exec_many(funcs, concurrency, timeout).result()
+
+    def stream(self, type: T, func: Callable[[Y], AsyncIterator], timeout: float | None = None) -> Iterator[T]:
+        # server streaming, e.g. lambda service: service.watch(id=1), messages are yielded as they arrive
+        return self.__iterate(lambda index: func(self.__service(index)), timeout)
+
+    def bidi(self, type: T, route: str, request_type: any, requests: Iterable, timeout: float | None = None) -> Iterator[T]:
+        # betterproto stubs have no stream-stream helper, so the route is called on the channel directly
+        return self.__iterate(lambda index: self.__bidi(index, route, request_type, type, requests, timeout), timeout)
+
+    def bench(self, func: Callable[[Y], Coroutine], name: str | None = None, rps: float | None = None, concurrency: int = 10, duration: float = 10, timeout: float | None = None,
+              as_json: bool = False, show: bool = True) -> BenchReport:
+        # outcomes are grpc status names, OK for a reply; spread over more channels when one http/2 connection saturates
+        report = self.__bench(func, name or f'grpc {self.host}:{self.port}', rps, concurrency, duration, timeout).result()
+
+        if show:
+            if as_json:
+                print(report.to_json())
+            else:
+                report.print()
+
+        return report
+
+    def stats(self) -> dict:
+        return {**self.__stats, 'latency': self.__latency.summary(), 'first_message': self.__first_message.summary()}
+
+    def close(self):
+        self.__close().result()
+
+    @_unsync
+    async def __exec(self, call: Callable[[Y], Coroutine], timeout: float | None = None):
+        return await self.__unary(call, timeout)
+
+    @_unsync
+    async def __exec_many(self, calls: list[Callable[[Y], Coroutine]], concurrency: int, timeout: float | None) -> list[tuple[any, Exception | None]]:
+        import asyncio
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(call: Callable[[Y], Coroutine]) -> tuple[any, Exception | None]:
+            async with semaphore:
+                try:
+                    return await self.__unary(call, timeout), None
+                except Exception as err:
+                    return None, err
+
+        return list(await asyncio.gather(*[one(call) for call in calls]))
+
+    @_unsync
+    async def __bench(self, func: Callable[[Y], Coroutine], name: str, rps: float | None, concurrency: int, duration: float, timeout: float | None) -> BenchReport:
+        import asyncio
+        from grpclib.exceptions import GRPCError
+        from pmod.bench import bench_run
+
+        async def call() -> tuple[str, bool]:
+            try:
+                await asyncio.wait_for(self.__attempt(func), timeout)
+                return 'OK', True
+            except GRPCError as err:
+                return err.status.name, False
+
+        return await bench_run(name, call, concurrency=concurrency, rps=rps, duration=duration)
+
+    @_unsync
+    async def __pump(self, open: Callable[[int], AsyncIterator], timeout: float | None, items: queue.Queue, done: object):
+        import asyncio
+
+        start = time.perf_counter()
+        deadline = None if timeout is None else start + timeout
+        self.__stats['streams'] += 1
+        messages = None
+        received = 0
+
+        try:
+            messages = open(self.__pick()).__aiter__()
+            while True:
+                remaining = None if deadline is None else max(0, deadline - time.perf_counter())
+                try:
+                    message = await asyncio.wait_for(messages.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+
+                if received == 0:
+                    self.__first_message.record(time.perf_counter() - start)
+                received += 1
+                self.__stats['messages'] += 1
+                items.put((message, None))
+
+            items.put((done, None))
+        except Exception as err:
+            self.__stats['errors'] += 1
+            items.put((None, err))
+        finally:
+            if messages is not None and hasattr(messages, 'aclose'):
+                await messages.aclose()
+
+    @_unsync
+    async def __close(self):
+        for index in range(len(self.__channels)):
+            self.__reset(index)
+
+    async def __unary(self, call: Callable[[Y], Coroutine], timeout: float | None):
+        import asyncio
+
+        start = time.perf_counter()
+        self.__stats['calls'] += 1
+        try:
+            # cancelling on the deadline resets the http/2 stream, the server sees the rpc cancelled
+            return await asyncio.wait_for(self.__attempt(call), timeout)
+        except Exception:
+            self.__stats['errors'] += 1
+            raise
+        finally:
+            self.__latency.record(time.perf_counter() - start)
+
+    async def __attempt(self, call: Callable[[Y], Coroutine]):
+        index = self.__pick()
+        try:
+            return await call(self.__service(index))
+        except TimeoutError:
+            raise
+        except OSError:
+            # the connection is gone (server restart, idle drop), reconnect once
+            self.__stats['reconnects'] += 1
+            self.__reset(index)
+            return await call(self.__service(index))
+
+    async def __bidi(self, index: int, route: str, request_type: any, reply_type: any, requests: Iterable, timeout: float | None) -> AsyncIterator:
+        import asyncio
+        from grpclib.const import Cardinality
+
+        self.__service(index)
+        async with self.__channels[index].request(route, Cardinality.STREAM_STREAM, request_type, reply_type, timeout=timeout) as stream:
+            await stream.send_request()
+
+            async def send():
+                for message in requests:
+                    await stream.send_message(message)
+                await stream.end()
+
+            # send and receive run side by side, replies are not held back until every request is out
+            sender = asyncio.ensure_future(send())
+            try:
+                async for message in stream:
+                    yield message
+                await sender
+            finally:
+                sender.cancel()
+
+    def __iterate(self, open: Callable[[int], AsyncIterator], timeout: float | None) -> Iterator:
+        # the stream is driven on the unsync loop, messages cross over to the caller thread through a queue
+        items = queue.Queue()
+        done = object()
+        task = self.__pump(open, timeout, items, done)
+        try:
+            while True:
+                item, err = items.get()
+                if err is not None:
+                    raise err
+                if item is done:
+                    return
+                yield item
+        finally:
+            if not task.done():
+                task.future.get_loop().call_soon_threadsafe(task.future.cancel)
+
+    def __pick(self) -> int:
+        index = self.__next
+        self.__next = (index + 1) % len(self.__channels)
+        return index
+
+    def __service(self, index: int) -> Y:
+        if self.__services[index] is None:
+            from grpclib.client import Channel
+            channel = Channel(host=self.host, port=self.port, ssl=self.port == 443)
+            self.__channels[index] = channel
+            self.__services[index] = self.stub(channel=channel)
+        return self.__services[index]
+
+    def __reset(self, index: int):
+        channel = self.__channels[index]
+        self.__channels[index] = None
+        self.__services[index] = None
+        if channel is not None:
+            channel.close()
@@ -8,28 +8,277 @@ licenses restricting copying, distribution and decompilation.
 All Rights Reserved.
 '''
 
+import os
+import csv
+import json
+import itertools
+import contextlib
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, IO, Iterable, Iterator, Mapping
 from dotenv import dotenv_values
 
 
-def get_env(*args) -> dict:
+# abs path → ((mtime_ns, size, inode), parsed values), a file is parsed again only when its stat changes
+__env_files: dict[str, tuple[tuple[int, int, int], dict]] = {}
+# paths → (stats of every file, frozen merged view)
+__env_merged: dict[tuple, tuple[tuple, Mapping[str, str | None]]] = {}
+__env_lock = threading.Lock()
+
+
+def get_env(*args, frozen: bool = False) -> dict | Mapping[str, str | None]:
+    # frozen returns the shared read-only view instead of a copy the caller may change
+    view = __env_view(args)
+    return view if frozen else dict(view)
+
+
+class EnvWatch(Mapping):
+    __paths    : tuple                              = ()
+    __interval : float                              = 1
+    __on_change: Callable[[Mapping], None] | None   = None
+
+    def __init__(self, *paths, interval: float = 1, on_change: Callable[[Mapping], None] | None = None):
+        # a read-only env that a background thread keeps in sync with the files, lookups never touch the disk
+        self.__paths = paths
+        self.__interval = interval
+        self.__on_change = on_change
+        self.__view = get_env(*paths, frozen=True)
+        self.__stop = threading.Event()
+        self.__thread = threading.Thread(target=self.__watch, daemon=True)
+        self.__thread.start()
+
+    def __getitem__(self, key: str) -> str | None:
+        return self.__view[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__view)
+
+    def __len__(self) -> int:
+        return len(self.__view)
+
+    def __enter__(self) -> 'EnvWatch':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.__stop.set()
+
+    def __watch(self):
+        while not self.__stop.wait(self.__interval):
+            try:
+                view = get_env(*self.__paths, frozen=True)
+            except Exception:
+                continue
+
+            if view is not self.__view:
+                self.__view = view
+                if self.__on_change is not None:
+                    self.__on_change(view)
+
+
+def __env_stat(path) -> tuple[int, int, int] | None:
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+    except OSError:
+        return None
+
+
+def __env_file(path) -> dict:
+    if not isinstance(path, (str, os.PathLike)):
+        # streams and None (dotenv searches for a .env) are not cacheable
+        return dotenv_values(path)
+
+    path = os.path.abspath(path)
+    stat = __env_stat(path)
+    if stat is None:
+        return {}
+
+    cached = __env_files.get(path)
+    if cached is not None and cached[0] == stat:
+        return cached[1]
+
+    values = dotenv_values(path)
+    with __env_lock:
+        __env_files[path] = (stat, values)
+    return values
+
+
+def __env_view(paths: tuple) -> Mapping[str, str | None]:
+    if not all(isinstance(path, (str, os.PathLike)) for path in paths):
+        env = {}
+        for path in paths:
+            env.update(__env_file(path))
+        return MappingProxyType(env)
+
+    key = tuple(os.path.abspath(path) for path in paths)
+    stats = tuple(__env_stat(path) for path in key)
+    cached = __env_merged.get(key)
+    if cached is not None and cached[0] == stats:
+        return cached[1]
+
     env = {}
-    for arg in args:
-        env.update(dotenv_values(arg))
-    return env
+    for path in key:
+        env.update(__env_file(path))
+
+    view = MappingProxyType(env)
+    with __env_lock:
+        __env_merged[key] = (stats, view)
+    return view
+
 
+def print_table(data: Iterable[dict], columns: list = None, sample: int | None = None, width: int | None = None):
+    # with sample and/or width the rows are streamed: column widths come from the first sample rows
+    # (capped at width, or exactly width without a sample), later cells that do not fit are cut
+    # and memory stays flat whatever the row count
+    rows = iter(data)
+    if sample is None and width is None:
+        window = data if isinstance(data, list) else list(rows)
+        rows = iter(())
+    else:
+        window = list(itertools.islice(rows, max(1, sample or 0)))
 
-def print_table(data: dict, columns: list = None):
     if not columns:
-        columns = list(data[0].keys() if data else [])
-    items = [columns]
+        columns = list(window[0].keys() if window else [])
+    if not columns:
+        return
 
-    for item in data:
-        items.append(['' if item[col] is None else str(
-            item[col]).replace('\n', ' | ') for col in columns])
+    cells = [[__table_cell(item[col]) for col in columns] for item in window]
+    if sample is None and width is not None:
+        sizes = [width] * len(columns)
+    else:
+        sizes = [max([len(str(col))] + [len(item[i]) for item in cells]) for i, col in enumerate(columns)]
+        if width is not None:
+            sizes = [min(size, width) for size in sizes]
 
-    sizes = [max(map(len, col)) for col in zip(*items)]
     formatter = ' | '.join(["{{:<{}}}".format(i) for i in sizes])
-    items.insert(1, ['-' * i for i in sizes])
+    print(formatter.format(*[__table_fit(str(col), size) for col, size in zip(columns, sizes)]))
+    print(formatter.format(*['-' * i for i in sizes]))
+
+    for item in cells:
+        print(formatter.format(*[__table_fit(cell, size) for cell, size in zip(item, sizes)]))
+    del cells, window
+
+    for item in rows:
+        print(formatter.format(*[__table_fit(__table_cell(item[col]), size) for col, size in zip(columns, sizes)]))
+
+
+def export_csv(data: Iterable[dict], dest: str | IO[str], columns: list = None, header: bool = True, chunk_rows: int = 1000, dialect: str = 'excel') -> int:
+    # rows go out chunk_rows at a time, a generator (e.g. DBX.iter_fetches) is never materialised
+    columns, rows = __export_rows(data, columns)
+    with __export_open(dest, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file, dialect=dialect)
+        if header and columns:
+            writer.writerow(columns)
+
+        count = 0
+        for chunk in __export_chunks(rows, chunk_rows):
+            writer.writerows([[item[col] for col in columns] for item in chunk])
+            count += len(chunk)
+        return count
+
+
+def export_tsv(data: Iterable[dict], dest: str | IO[str], columns: list = None, header: bool = True, chunk_rows: int = 1000) -> int:
+    return export_csv(data, dest, columns=columns, header=header, chunk_rows=chunk_rows, dialect='excel-tab')
+
+
+def export_jsonl(data: Iterable[dict], dest: str | IO[str], columns: list = None, chunk_rows: int = 1000) -> int:
+    columns, rows = __export_rows(data, columns)
+    with __export_open(dest, 'w', encoding='utf-8') as file:
+        count = 0
+        for chunk in __export_chunks(rows, chunk_rows):
+            # dates, decimals and uuids as their string form
+            file.write(''.join([json.dumps({col: item[col] for col in columns}, ensure_ascii=False, default=str) + '\n' for item in chunk]))
+            count += len(chunk)
+        return count
+
+
+def export_parquet(data: Iterable[dict], dest: str | IO[bytes], columns: list = None, chunk_rows: int = 10000, schema: Any = None, infer_rows: int = 100000) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('pyarrow is required for export_parquet, pip install pyarrow')
+
+    # every chunk becomes a row group; without a schema, up to infer_rows rows are held back until every
+    # column has seen a value, a column that is NULL in the first rows (normal for db results) would
+    # otherwise be typed null and reject the first real value. columns still NULL past infer_rows
+    # (e.g. deleted_at) are written as strings so memory stays bounded; pass schema to type them.
+    # empty input still writes a file with the columns
+    columns, rows = __export_rows(data, columns)
+    chunks = __export_chunks(rows, chunk_rows)
+    pending = []
+    as_text: set[str] = set()
+    if schema is None:
+        held = 0
+        for chunk in chunks:
+            pending.append(pa.Table.from_pylist([{col: item[col] for col in columns} for item in chunk]))
+            held += len(chunk)
+            schema = pa.unify_schemas([table.schema for table in pending], promote_options='permissive')
+            if not any([pa.types.is_null(field.type) for field in schema]):
+                break
+            if held >= infer_rows:
+                as_text = {field.name for field in schema if pa.types.is_null(field.type)}
+                schema = pa.schema([pa.field(field.name, pa.string()) if field.name in as_text else field for field in schema])
+                break
+        if schema is None:
+            schema = pa.schema([(col, pa.null()) for col in columns])
+
+    def table_of(chunk: list[dict]):
+        if len(as_text) == 0:
+            return pa.Table.from_pylist([{col: item[col] for col in columns} for item in chunk], schema=schema)
+        return pa.Table.from_pylist([{col: str(item[col]) if col in as_text and item[col] is not None else item[col] for col in columns} for item in chunk], schema=schema)
+
+    count = 0
+    try:
+        with pq.ParquetWriter(dest, schema) as writer:
+            for table in pending:
+                writer.write_table(table.cast(schema))
+                count += table.num_rows
+            del pending
+
+            for chunk in chunks:
+                writer.write_table(table_of(chunk))
+                count += len(chunk)
+    except BaseException:
+        # no half written file left behind
+        if isinstance(dest, (str, os.PathLike)) and os.path.exists(dest):
+            os.remove(dest)
+        raise
+    return count
+
+
+def __export_rows(data: Iterable[dict], columns: list | None) -> tuple[list, Iterator[dict]]:
+    rows = iter(data)
+    if columns:
+        return list(columns), rows
+
+    first = next(rows, None)
+    if first is None:
+        return [], rows
+    return list(first.keys()), itertools.chain([first], rows)
+
+
+def __export_chunks(rows: Iterator[dict], chunk_rows: int) -> Iterator[list[dict]]:
+    while True:
+        chunk = list(itertools.islice(rows, max(1, chunk_rows)))
+        if not chunk:
+            return
+        yield chunk
+
+
+def __export_open(dest: str | IO, mode: str, **kwargs) -> IO:
+    if isinstance(dest, (str, os.PathLike)):
+        return open(dest, mode, **kwargs)
+    # a caller supplied stream stays open
+    return contextlib.nullcontext(dest)
+
+
+def __table_cell(val) -> str:
+    return '' if val is None else str(val).replace('\n', ' | ')
+
 
-    for item in items:
-        print(formatter.format(*item))
+def __table_fit(val: str, size: int) -> str:
+    return val if len(val) <= size else val[:max(0, size - 1)] + '…'
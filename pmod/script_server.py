@@ -13,6 +13,8 @@ from typing import Callable, Optional
 from packaging.version import Version
 from pmod.script_server_model import ScriptServerConf, ScriptServerEnv
 from pmod.script_server_util import ScriptServerUtil
+from pmod.script_server_trace import ScriptServerTrace
+from pmod.script_server_stage import ScriptServerStage, ScriptServerGraph
 from pmod.script_server_user_func import ScriptServerUserFunc
 
 
@@ -33,6 +35,7 @@ class ScripServer:
     __above_env_image_version: Version | None = None
     __prefer_next_version: Version | None = None
     __user_next_version: Version | None = None
+    __trace: ScriptServerTrace | None = None
 
     def __init__(self,
                  conf: ScriptServerConf,
@@ -49,29 +52,58 @@ class ScripServer:
         self.__add_build_arg_func = add_build_arg_func
 
     def run(self):
-        self.__validate()
-        self.__select_env()
-        self.__validate_selected()
-        self.__git_diff_branch()
-        self.__get_current_image_version()
-        self.__diff_branch_with_tag_version()
-        self.__get_below_or_above_image_version()
-        self.__get_user_next_version()
-        self.__ask_user_next_version()
-        self.__create_git_tag()
-        self.__perform_git_clone()
-        self.__execute_commands_before_image_build()
-        self.__execute_after_clone_func()
-        self.__perform_docker_resolve()
-        self.__perform_build_image()
-        self.__zip_docker_image()
-        self.__perform_image_push()
-        self.__delete_existing_image()
-        self.__delete_build_directory()
-        self.__perform_docker_prune()
-        self.__perform_deployment()
-        self.__wait_rolling_update()
-        self.__success_message()
+        # after validate-selected the branch diff and both image lookups only read remote state, so they run
+        # side by side, their commands never get the terminal (sh_get tty=False) so the next prompt still can;
+        # prompts run alone, anything without `after` waits for the stage declared before it
+        lookups = ['validate-selected']
+        stages: list[ScriptServerStage] = [
+            ScriptServerStage('validate',                            self.__validate),
+            ScriptServerStage('select-env',                          self.__select_env, interactive=True),
+            ScriptServerStage('validate-selected',                   self.__validate_selected),
+            ScriptServerStage('git-diff-branch',                     self.__git_diff_branch, after=lookups),
+            ScriptServerStage('get-current-image-version',           self.__get_current_image_version, after=lookups),
+            ScriptServerStage('diff-branch-with-tag-version',        self.__diff_branch_with_tag_version, after=['get-current-image-version']),
+            ScriptServerStage('get-below-or-above-image-version',    self.__get_below_or_above_image_version, after=lookups),
+            ScriptServerStage('get-user-next-version',               self.__get_user_next_version, after=['git-diff-branch', 'diff-branch-with-tag-version', 'get-below-or-above-image-version']),
+            ScriptServerStage('ask-user-next-version',               self.__ask_user_next_version, interactive=True),
+            ScriptServerStage('create-git-tag',                      self.__create_git_tag),
+            ScriptServerStage('perform-git-clone',                   self.__perform_git_clone),
+            ScriptServerStage('execute-commands-before-image-build', self.__execute_commands_before_image_build),
+            ScriptServerStage('execute-after-clone-func',            self.__execute_after_clone_func),
+            ScriptServerStage('perform-docker-resolve',              self.__perform_docker_resolve),
+            ScriptServerStage('perform-build-image',                 self.__perform_build_image),
+            ScriptServerStage('zip-docker-image',                    self.__zip_docker_image),
+            ScriptServerStage('perform-image-push',                  self.__perform_image_push),
+            ScriptServerStage('delete-existing-image',               self.__delete_existing_image),
+            ScriptServerStage('delete-build-directory',              self.__delete_build_directory),
+            ScriptServerStage('perform-docker-prune',                self.__perform_docker_prune),
+            ScriptServerStage('perform-deployment',                  self.__perform_deployment),
+            ScriptServerStage('wait-rolling-update',                 self.__wait_rolling_update),
+            ScriptServerStage('success-message',                     self.__success_message),
+        ]
+
+        self.__trace = ScriptServerTrace()
+        self.__util.trace = self.__trace
+        try:
+            ScriptServerGraph(stages, self.__trace).run()
+        finally:
+            # every run ends in exit(), success included, so the report goes out here
+            self.__report_trace()
+
+    def __report_trace(self):
+        if self.__conf is None or self.__trace is None:
+            return
+
+        if self.__conf.trace_summary:
+            print('\n\n❖ stage timing')
+            print(self.__trace.summary())
+
+        if self.__conf.trace_path is not None:
+            try:
+                self.__trace.export_chrome(self.__conf.trace_path)
+                print(f'trace: {self.__conf.trace_path}')
+            except Exception as err:
+                print(f'🔴 error: cannot write trace, {err}')
 
     def __validate(self):
         if self.__conf is None:
@@ -299,7 +331,7 @@ class ScripServer:
         err: str | None = None
         current_version: Version | None = None
 
-        current_version, err = self.__util.fetch_latest_image_version(current[0], current[1])
+        current_version, err = self.__util.fetch_latest_image_version(current[0], current[1], tty=False)
         if err is not None:
             if 'TAG not found in' not in err:
                 exit()
@@ -351,13 +383,13 @@ class ScripServer:
         above_env_image_version: Version | None = None
 
         if below is not None:
-            below_env_image_version, err = self.__util.fetch_latest_image_version(below[0], below[1])
+            below_env_image_version, err = self.__util.fetch_latest_image_version(below[0], below[1], tty=False)
             if err is not None:
                 print(f'🔴 error: {err}')
                 exit()
 
         if above is not None:
-            above_env_image_version, err = self.__util.fetch_latest_image_version(above[0], above[1])
+            above_env_image_version, err = self.__util.fetch_latest_image_version(above[0], above[1], tty=False)
             if err is not None:
                 if 'TAG not found in' not in err:
                     print(f'🔴 error: {err}')
@@ -723,7 +755,7 @@ class ScripServer:
             return
 
         print('\n→ execute after clone func')
-        user_func = ScriptServerUserFunc(self.__conf, self.__selected_env_code)
+        user_func = ScriptServerUserFunc(self.__conf, self.__selected_env_code, self.__trace)
         self.__after_clone_func(user_func)
 
     def __perform_docker_resolve(self):
@@ -22,6 +22,8 @@ class ScriptServerConf:
     host_build_path  : str | None  = None
     cmds_before_build: list[str]   = []
     terminate_when   : str | None  = None
+    trace_summary    : bool | None = True    # optional, print the stage timing table when the run ends
+    trace_path       : str | None  = None    # optional, chrome trace json, e.g. value: /tmp/deploy-trace.json
 
 
 class ScriptServerEnv:
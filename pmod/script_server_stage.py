@@ -0,0 +1,150 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+import io
+import sys
+import threading
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterator
+from pmod.script_server_trace import ScriptServerTrace
+
+
+class ScriptServerStage:
+    name       : str                        = ''
+    func       : Callable[[], None] | None  = None
+    after      : list[str] | None           = None   # optional, default: the stage declared before
+    interactive: bool                       = False  # prompts the user, never runs next to another stage
+
+    def __init__(self, name: str, func: Callable[[], None], after: list[str] | None = None, interactive: bool = False):
+        self.name = name
+        self.func = func
+        self.after = after
+        self.interactive = interactive
+
+
+class ScriptServerOutput:
+    # stands in for sys.stdout, prints from a stage running on a worker thread are buffered for that stage
+    def __init__(self, target):
+        self.__target = target
+        self.__local = threading.local()
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self.__local, 'buffer', None)
+        return (self.__target if buffer is None else buffer).write(text)
+
+    def flush(self):
+        if getattr(self.__local, 'buffer', None) is None:
+            self.__target.flush()
+
+    @contextmanager
+    def capture(self) -> Iterator[io.StringIO]:
+        self.__local.buffer = io.StringIO()
+        try:
+            yield self.__local.buffer
+        finally:
+            self.__local.buffer = None
+
+    def __getattr__(self, name: str):
+        return getattr(self.__target, name)
+
+
+class ScriptServerGraph:
+    __stages     : list[ScriptServerStage]     = []
+    __trace      : ScriptServerTrace | None    = None
+    __max_workers: int                         = 4
+
+    def __init__(self, stages: list[ScriptServerStage], trace: ScriptServerTrace | None = None, max_workers: int = 4):
+        names = [stage.name for stage in stages]
+        for i, stage in enumerate(stages):
+            if stage.after is None:
+                stage.after = [] if i == 0 else [names[i - 1]]
+            for name in stage.after:
+                if name not in names[:i]:
+                    raise ValueError(f'stage {stage.name} must be declared after {name}')
+
+        self.__stages = stages
+        self.__trace = trace
+        self.__max_workers = max_workers
+
+    def run(self):
+        # independent stages run side by side, their output is replayed in declared order and the
+        # first failure (exit() included) in declared order is raised, so a run reads like a serial one
+        target = sys.stdout
+        output = ScriptServerOutput(target)
+        pending = list(self.__stages)
+        running: dict[Future, ScriptServerStage] = {}
+        done: set[str] = set()
+        finished: dict[str, tuple[str, BaseException | None]] = {}
+        replayed = 0
+
+        def replay() -> BaseException | None:
+            nonlocal replayed
+            while replayed < len(self.__stages) and self.__stages[replayed].name in finished:
+                text, err = finished[self.__stages[replayed].name]
+                output.write(text)
+                output.flush()
+                replayed += 1
+                if err is not None:
+                    return err
+            return None
+
+        sys.stdout = output
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.__max_workers)) as executor:
+                while len(pending) > 0 or len(running) > 0:
+                    ready = [stage for stage in pending if set(stage.after) <= done]
+
+                    if len(running) == 0 and len(ready) > 0 and (len(ready) == 1 or ready[0].interactive):
+                        # nothing else in flight, run on this thread and straight to the terminal
+                        stage = ready[0]
+                        pending.remove(stage)
+                        self.__call(stage)
+                        finished[stage.name] = ('', None)
+                        done.add(stage.name)
+                        replay()
+                        continue
+
+                    for stage in [stage for stage in ready if not stage.interactive]:
+                        pending.remove(stage)
+                        running[executor.submit(self.__buffered, output, stage)] = stage
+
+                    if len(running) == 0:
+                        break
+
+                    completed, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        stage = running.pop(future)
+                        finished[stage.name] = future.result()
+                        if finished[stage.name][1] is None:
+                            done.add(stage.name)
+
+                    err = replay()
+                    if err is not None:
+                        # let the stages already in flight end, their output is dropped like a serial run never reached them
+                        wait(list(running))
+                        raise err
+
+                if len(pending) > 0:
+                    raise RuntimeError(f'stages never became ready: {", ".join([stage.name for stage in pending])}')
+        finally:
+            sys.stdout = target
+
+    def __call(self, stage: ScriptServerStage):
+        with self.__trace.stage(stage.name) if self.__trace is not None else nullcontext():
+            stage.func()
+
+    def __buffered(self, output: ScriptServerOutput, stage: ScriptServerStage) -> tuple[str, BaseException | None]:
+        with output.capture() as buffer:
+            try:
+                self.__call(stage)
+                return buffer.getvalue(), None
+            except BaseException as err:
+                return buffer.getvalue(), err
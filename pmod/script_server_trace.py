@@ -0,0 +1,142 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+import os
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+from tabulate import tabulate
+
+
+class ScriptServerSpan:
+    name      : str          = ''
+    kind      : str          = 'stage'   # types: stage, command
+    stage     : str | None   = None      # owning stage of a command
+    start     : float        = 0         # seconds since the trace started
+    wall      : float        = 0
+    cpu       : float        = 0         # this process, user + system, stages running side by side share it
+    child_cpu : float        = 0         # finished subprocesses (os.system, sh_get), user + system
+    status    : str          = 'ok'      # types: ok, exit, error
+    code      : int | None   = None      # exit code of a command
+    thread    : int          = 0
+
+
+class ScriptServerTrace:
+    __credentials = re.compile(r'(https?://)[^/\s@]+@')
+
+    def __init__(self):
+        self.spans: list[ScriptServerSpan] = []
+        self.__origin = time.perf_counter()
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[ScriptServerSpan]:
+        span = ScriptServerSpan()
+        span.name = name
+        span.kind = 'stage'
+        span.thread = threading.get_ident()
+
+        previous = getattr(self.__local, 'stage', None)
+        self.__local.stage = name
+
+        wall, times = time.perf_counter(), os.times()
+        span.start = wall - self.__origin
+        try:
+            yield span
+        except SystemExit:
+            # every stage ends a run with exit(), success included
+            span.status = 'exit'
+            raise
+        except BaseException:
+            span.status = 'error'
+            raise
+        finally:
+            end = os.times()
+            span.wall = time.perf_counter() - wall
+            span.cpu = (end.user - times.user) + (end.system - times.system)
+            span.child_cpu = (end.children_user - times.children_user) + (end.children_system - times.children_system)
+            self.__local.stage = previous
+            with self.__lock:
+                self.spans.append(span)
+
+    @contextmanager
+    def command(self, cmd: str) -> Iterator[ScriptServerSpan]:
+        span = ScriptServerSpan()
+        # never keep credentials from clone urls and the like
+        span.name = self.__credentials.sub(r'\1***@', ' '.join(cmd.split()))[:160]
+        span.kind = 'command'
+        span.stage = getattr(self.__local, 'stage', None)
+        span.thread = threading.get_ident()
+
+        wall, times = time.perf_counter(), os.times()
+        span.start = wall - self.__origin
+        try:
+            yield span
+        except BaseException:
+            span.status = 'error'
+            raise
+        finally:
+            end = os.times()
+            span.wall = time.perf_counter() - wall
+            span.child_cpu = (end.children_user - times.children_user) + (end.children_system - times.children_system)
+            with self.__lock:
+                self.spans.append(span)
+
+    def summary(self) -> str:
+        stages = [span for span in self.spans if span.kind == 'stage']
+        # stages may overlap, the total is the elapsed time from the first stage start to the last stage end
+        total = 0 if len(stages) == 0 else max([span.start + span.wall for span in stages]) - min([span.start for span in stages])
+        rows = []
+
+        for span in sorted(stages, key=lambda span: span.start):
+            commands = [item for item in self.spans if item.kind == 'command' and item.stage == span.name]
+            rows.append([
+                span.name,
+                span.wall,
+                span.cpu,
+                span.child_cpu,
+                len(commands),
+                sum([item.wall for item in commands]),
+                f'{0 if total == 0 else span.wall / total * 100:.1f}%',
+                span.status,
+            ])
+
+        rows.append(['total', total, sum([span.cpu for span in stages]), sum([span.child_cpu for span in stages]),
+                     len([span for span in self.spans if span.kind == 'command']), None, None, None])
+        return tabulate(rows, headers=['stage', 'wall s', 'cpu s', 'child cpu s', 'commands', 'command s', 'share', 'status'], floatfmt='.2f')
+
+    def export_chrome(self, path: str):
+        # chrome trace event format, open with chrome://tracing or ui.perfetto.dev
+        pid = os.getpid()
+        events = []
+        for span in self.spans:
+            args = {'status': span.status}
+            if span.kind == 'stage':
+                args.update({'cpu_s': round(span.cpu, 6), 'child_cpu_s': round(span.child_cpu, 6)})
+            else:
+                args.update({'stage': span.stage, 'code': span.code, 'child_cpu_s': round(span.child_cpu, 6)})
+
+            events.append({
+                'name': span.name,
+                'cat' : span.kind,
+                'ph'  : 'X',
+                'ts'  : round(span.start * 1_000_000),
+                'dur' : round(span.wall * 1_000_000),
+                'pid' : pid,
+                'tid' : span.thread,
+                'args': args,
+            })
+
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file, indent=2)
@@ -11,14 +11,17 @@ All Rights Reserved.
 import os
 from typing import Optional
 from pmod.script_server_model import ScriptServerConf
+from pmod.script_server_trace import ScriptServerTrace
 
 
 class ScriptServerUserFunc:
     __conf: ScriptServerConf | None = None
+    __trace: ScriptServerTrace | None = None
     selected_env_code: str | None = None
 
-    def __init__(self, conf: ScriptServerConf, selected_env_code: str):
+    def __init__(self, conf: ScriptServerConf, selected_env_code: str, trace: ScriptServerTrace | None = None):
         self.__conf = conf
+        self.__trace = trace
         self.selected_env_code = selected_env_code
 
     def execute_command(self, command: str) -> Optional[str]:
@@ -31,7 +34,13 @@ class ScriptServerUserFunc:
         cmd = 'chroot /hostfs /bin/bash -c "%s"'
         cmd = cmd % 'cd %s; %s'
         cmd = cmd % (self.__conf.host_build_path, command)
-        err_code = os.system(cmd)
+        if self.__trace is None:
+            err_code = os.system(cmd)
+        else:
+            with self.__trace.command(cmd) as span:
+                err_code = os.system(cmd)
+                span.code = err_code
+
         if err_code != 0:
             return f'os error code {err_code} from command "{command}"'
         return None
@@ -13,16 +13,39 @@ import time
 import requests
 import subprocess
 import re
-from typing import Any, Optional
+from typing import Any, ContextManager, Optional
+from contextlib import nullcontext
 from tabulate import tabulate
 from packaging.version import Version
 from pmod.script_server_model import ScriptServerConf, ScriptServerEnv
+from pmod.script_server_trace import ScriptServerSpan, ScriptServerTrace
 
 
 class ScriptServerUtil:
-    def sh_get(self, cmd: str) -> tuple[str, str]:
-        process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-        return process.communicate()
+    trace: ScriptServerTrace | None = None
+
+    def sh_get(self, cmd: str, tty: bool = True) -> tuple[str, str]:
+        # tty=False for commands running next to other stages: no terminal stdin, so nothing can leave it in raw mode.
+        # such commands run without `docker exec -t`, their progress lines land on stderr, only a failing exit is an error
+        with self.__command(cmd) as span:
+            process = subprocess.Popen(cmd, shell=True, stdin=None if tty else subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+            out, err = process.communicate()
+            if span is not None:
+                span.code = process.returncode
+            if not tty:
+                err = '' if process.returncode == 0 else (err or f'exit code {process.returncode}')
+            return out, err
+
+    def sh_run(self, cmd: str) -> int:
+        # os.system, timed when a trace is attached
+        with self.__command(cmd) as span:
+            err_code = os.system(cmd)
+            if span is not None:
+                span.code = err_code
+            return err_code
+
+    def __command(self, cmd: str) -> ContextManager[ScriptServerSpan | None]:
+        return nullcontext() if self.trace is None else self.trace.command(cmd)
 
     def join_words(self, items: list[str], unionSeparator: str = ',', lastSeparator: str = 'and') -> str:
         if len(items) > 2:
@@ -177,18 +200,18 @@ class ScriptServerUtil:
         new_version = '.'.join(ls)
         return Version(f'{new_version}.{pre_name}{pre_ver + 1}')
 
-    def fetch_latest_image_version(self, env: ScriptServerEnv, env_name: str) -> tuple[Version | None, str | None]:
+    def fetch_latest_image_version(self, env: ScriptServerEnv, env_name: str, tty: bool = True) -> tuple[Version | None, str | None]:
         if env.image_registry not in ['gcp-artifact-registry']:
             return None, 'unhandled logic'
 
         if env.image_registry == 'gcp-artifact-registry':
             print(f'\n→ call gcloud api: get image last version on {env_name}')
 
-            cmd: str = 'chroot /hostfs /bin/bash -c "docker exec -it %s %s"'
-            cmd = cmd % (env.container_cloud_sdk, 'gcloud artifacts tags list --location=%s --repository=%s --package=%s --format=\'table(TAG)\'')
+            cmd: str = 'chroot /hostfs /bin/bash -c "docker exec %s%s %s"'
+            cmd = cmd % ('-it ' if tty else '', env.container_cloud_sdk, 'gcloud artifacts tags list --location=%s --repository=%s --package=%s --format=\'table(TAG)\'')
             cmd = cmd % (env.gcp_artifact_registry_location, env.gcp_artifact_registry_repository, env.gcp_artifact_registry_package)
 
-            out, err = self.sh_get(cmd)
+            out, err = self.sh_get(cmd, tty=tty)
             if err != "":
                 print(f'🔴 error: {err}')
                 return None, err
@@ -225,14 +248,14 @@ class ScriptServerUtil:
         print('\n→ clean the build directory')
         cmd = 'rm -rf %s; mkdir -p %s'
         cmd = cmd % (host_build_path, host_build_path)
-        err_code = os.system(cmd)
+        err_code = self.sh_run(cmd)
         if err_code != 0:
             return f'os error code {err_code}'
 
         print(f'\n→ clone the git project, tag: {tag_name}')
         cmd = 'cd %s; git clone --quiet -c advice.detachedHead=false --depth 1 --branch %s https://%s:%s@%s.git .'
         cmd = cmd % (host_build_path, tag_name, conf.git_user, conf.git_pass, conf.git_repo)
-        err_code = os.system(cmd)
+        err_code = self.sh_run(cmd)
         if err_code != 0:
             return f'os error code {err_code}'
 
@@ -240,7 +263,7 @@ class ScriptServerUtil:
             print('\n→ prepare project directory')
             cmd = cmd % "cd %s; mv %s .___; find . -maxdepth 1 ! -name '.' ! -name '.___'  -exec rm -rf {} +; mv .___/{.,}* .; rm -rf .___"
             cmd = cmd % (host_build_path, conf.git_project_path)
-            err_code = os.system(cmd)
+            err_code = self.sh_run(cmd)
             if err_code != 0:
                 return f'os error code {err_code}'
 
@@ -251,7 +274,7 @@ class ScriptServerUtil:
             cmd = 'chroot /hostfs /bin/bash -c "%s"'
             cmd = cmd % 'cd %s; %s'
             cmd = cmd % (conf.host_build_path, conf.cmds_before_build[i])
-            err_code = os.system(cmd)
+            err_code = self.sh_run(cmd)
             if err_code != 0:
                 return f'os error code {err_code} from command "{conf.cmds_before_build[i]}"'
 
@@ -261,7 +284,7 @@ class ScriptServerUtil:
             cmd = 'chroot /hostfs /bin/bash -c "%s"'
             cmd = cmd % 'cd %s; %s'
             cmd = cmd % (conf.host_build_path, selected_env.cmds_before_build[i])
-            err_code = os.system(cmd)
+            err_code = self.sh_run(cmd)
             if err_code != 0:
                 return f'os error code {err_code} from command "{selected_env.cmds_before_build[i]}"'
 
@@ -331,7 +354,7 @@ class ScriptServerUtil:
             cmd = 'chroot /hostfs /bin/bash -c "%s"'
             cmd = cmd % 'docker rmi %s:%s'
             cmd = cmd % (selected_env.image_name, version)
-            err_code = os.system(cmd)
+            err_code = self.sh_run(cmd)
             if err_code != 0:
                 return f'os error code {err_code}'
 
@@ -350,7 +373,7 @@ class ScriptServerUtil:
             cmd = cmd % (conf.host_build_path, cmd_build_2)
             cmd = cmd % (conf.dockerfile_path, version, conf.timezone, add_build_arg, f'{selected_env.image_name}:{version}')
 
-        err_code = os.system(cmd)
+        err_code = self.sh_run(cmd)
         if err_code != 0:
             return f'os error code {err_code}'
         print('\n⠀')
@@ -362,7 +385,7 @@ class ScriptServerUtil:
         cmd = 'chroot /hostfs /bin/bash -c "%s"'
         cmd = cmd % 'docker exec -it %s docker push %s:%s'
         cmd = cmd % (selected_env.container_cloud_sdk, selected_env.image_name, version)
-        err_code = os.system(cmd)
+        err_code = self.sh_run(cmd)
         if err_code != 0:
             return f'os error code {err_code}'
         return None
@@ -383,7 +406,7 @@ class ScriptServerUtil:
         cmd = 'chroot /hostfs /bin/bash -c "%s"'
         cmd = cmd % 'docker save %s | gzip > %s'
         cmd = cmd % (image, zip_file)
-        err_code = os.system(cmd)
+        err_code = self.sh_run(cmd)
         if err_code != 0:
             return f'os error code {err_code}'
         return None
@@ -392,19 +415,19 @@ class ScriptServerUtil:
         zip_file: str = f'/hostfs{self.get_file_path_zip_docker_image(conf, selected_env, ver)}'
         cmd = 'scp -o StrictHostKeyChecking=no -i %s %s %s@%s:~/%s'
         cmd = cmd % (selected_env.vm_ssh_key_path, zip_file, selected_env.vm_username, selected_env.vm_ip_address, os.path.basename(zip_file))
-        err_code = os.system(cmd)
+        err_code = self.sh_run(cmd)
         if err_code != 0:
             return f'os error code {err_code}'
 
         cmd = 'ssh -o StrictHostKeyChecking=no -i %s %s@%s "gunzip -c ~/%s | docker load"'
         cmd = cmd % (selected_env.vm_ssh_key_path, selected_env.vm_username, selected_env.vm_ip_address, os.path.basename(zip_file))
-        err_code = os.system(cmd)
+        err_code = self.sh_run(cmd)
         if err_code != 0:
             return f'os error code {err_code}'
 
         cmd = 'ssh -o StrictHostKeyChecking=no -i %s %s@%s "rm -rf %s"'
         cmd = cmd % (selected_env.vm_ssh_key_path, selected_env.vm_username, selected_env.vm_ip_address, os.path.basename(zip_file))
-        err_code = os.system(cmd)
+        err_code = self.sh_run(cmd)
         if err_code != 0:
             return f'os error code {err_code}'
         return None
@@ -455,7 +478,7 @@ class ScriptServerUtil:
         cmd = 'chroot /hostfs /bin/bash -c "%s"'
         cmd = cmd % 'docker rmi %s:%s'
         cmd = cmd % (selected_env.image_name, version)
-        err_code = os.system(cmd)
+        err_code = self.sh_run(cmd)
         if err_code != 0:
             return f'os error code {err_code}'
         return None
@@ -464,7 +487,7 @@ class ScriptServerUtil:
         cmd = 'chroot /hostfs /bin/bash -c "%s"'
         cmd = cmd % 'rm -rf %s'
         cmd = cmd % (conf.host_build_path)
-        err_code = os.system(cmd)
+        err_code = self.sh_run(cmd)
         if err_code != 0:
             return f'os error code {err_code}'
         return None
@@ -472,7 +495,7 @@ class ScriptServerUtil:
     def docker_prune(self) -> Optional[str]:
         cmd = 'chroot /hostfs /bin/bash -c "%s"'
         cmd = cmd % 'docker container prune -f; docker image prune -f; docker builder prune -f'
-        err_code = os.system(cmd)
+        err_code = self.sh_run(cmd)
         if err_code != 0:
             return f'os error code {err_code}'
         return None
@@ -486,7 +509,7 @@ class ScriptServerUtil:
         cmd_base = cmd_base % (selected_env.container_cloud_sdk + ' %s')
         cmd = cmd_base % ('kubectl set image -n {ns} deployment/{dep} {dep}={img}')
         cmd = cmd.format(ns=selected_env.image_namespace, dep=selected_env.k8s_deployment_name, img=image)
-        err_code = os.system(cmd)
+        err_code = self.sh_run(cmd)
         if err_code != 0:
             return f'os error code {err_code}'
         return None
@@ -0,0 +1,95 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+# in-process grpc server shared by the grpc test scripts
+import random
+import asyncio
+import threading
+import betterproto
+import grpclib.const
+import grpclib.server
+from dataclasses import dataclass
+from typing import AsyncGenerator
+from grpclib.const import Status
+from grpclib.exceptions import GRPCError
+
+
+# hand written betterproto message and stub, the same shape protoc would generate
+@dataclass
+class Ping(betterproto.Message):
+    message: str = betterproto.string_field(1)
+    count  : int = betterproto.int32_field(2)
+
+
+class PingServiceStub(betterproto.ServiceStub):
+    async def ping(self, *, message: str = '') -> Ping:
+        return await self._unary_unary('/pmod.test.PingService/Ping', Ping(message=message), Ping)
+
+    async def slow(self, *, message: str = '') -> Ping:
+        return await self._unary_unary('/pmod.test.PingService/Slow', Ping(message=message), Ping)
+
+    async def count(self, *, count: int = 0) -> AsyncGenerator[Ping, None]:
+        async for response in self._unary_stream('/pmod.test.PingService/Count', Ping(count=count), Ping):
+            yield response
+
+
+class PingService:
+    # latency: (min, max) seconds added to every ping, failure_rate: share of pings answered UNAVAILABLE
+    def __init__(self, latency: tuple[float, float] | None = None, failure_rate: float = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    async def ping(self, stream):
+        request = await stream.recv_message()
+        if self.latency is not None:
+            await asyncio.sleep(random.uniform(*self.latency))
+        if random.random() < self.failure_rate:
+            raise GRPCError(Status.UNAVAILABLE, 'try again')
+        await stream.send_message(Ping(message=request.message))
+
+    async def slow(self, stream):
+        request = await stream.recv_message()
+        await asyncio.sleep(1)
+        await stream.send_message(Ping(message=request.message))
+
+    async def count(self, stream):
+        request = await stream.recv_message()
+        for i in range(request.count):
+            await stream.send_message(Ping(count=i))
+            await asyncio.sleep(0.01)
+
+    async def echo(self, stream):
+        async for request in stream:
+            await stream.send_message(Ping(message=request.message.upper()))
+
+    def __mapping__(self):
+        return {
+            '/pmod.test.PingService/Ping' : grpclib.const.Handler(self.ping,  grpclib.const.Cardinality.UNARY_UNARY,   Ping, Ping),
+            '/pmod.test.PingService/Slow' : grpclib.const.Handler(self.slow,  grpclib.const.Cardinality.UNARY_UNARY,   Ping, Ping),
+            '/pmod.test.PingService/Count': grpclib.const.Handler(self.count, grpclib.const.Cardinality.UNARY_STREAM,  Ping, Ping),
+            '/pmod.test.PingService/Echo' : grpclib.const.Handler(self.echo,  grpclib.const.Cardinality.STREAM_STREAM, Ping, Ping),
+        }
+
+
+def serve(service: PingService | None = None) -> int:
+    # runs on its own event loop thread, returns the bound port once it listens
+    ready = threading.Event()
+    bound = {}
+
+    async def run():
+        server = grpclib.server.Server([service or PingService()])
+        await server.start('127.0.0.1', 0)
+        bound['port'] = server._server.sockets[0].getsockname()[1]
+        ready.set()
+        await server.wait_closed()
+
+    threading.Thread(target=lambda: asyncio.new_event_loop().run_until_complete(run()), daemon=True).start()
+    ready.wait()
+    return bound['port']
@@ -12,6 +12,11 @@ All Rights Reserved.
 import pmod
 import os
 import sys
+import time
+import asyncio
+import tracemalloc
+import contextlib
+import pyarrow.parquet as pq
 sys.path.insert(1, os.path.split(
     os.path.dirname(os.path.abspath(__file__)))[0])
 
@@ -29,4 +34,188 @@ else:
     pmod.print_table(rows)
 
 
+# %%
+# pooled connection, reused across calls
+dbx_pool = pmod.DBX(kv=env, prefix='DB', pool=True, pool_min=1, pool_max=4)
+
+for _ in range(3):
+    rows, err = dbx_pool.fetches(query=query)
+    if err is not None:
+        print(err)
+        break
+
+dbx_pool.close()
+
+
+# %%
+# server side cursor, rows are streamed in batches and printed as they arrive
+rows, err = dbx.iter_fetches(query=query, batch_size=500)
+
+if err is not None:
+    print(err)
+else:
+    pmod.print_table(rows, sample=500)
+
+# stopping early hands the connection back, also when the rows are never read
+rows, err = dbx.iter_fetches(query=query, batch_size=500)
+if err is None:
+    with rows:
+        print(next(rows, None))
+
+
+# %%
+# bulk load through COPY, then dump it back as csv
+err = dbx.exec('CREATE TABLE IF NOT EXISTS pmod_copy (id int, name text)')
+rows = ({'id': i, 'name': f'name-{i}'} for i in range(10000))
+
+err = err or dbx.copy_from('pmod_copy', rows)
+err = err or dbx.exec_many('INSERT INTO pmod_copy (id, name) VALUES %s', [(i, None) for i in range(100)], values=True)
+err = err or dbx.copy_to(sys.stdout, query='SELECT * FROM pmod_copy WHERE id < %s', vars=[5], header=True)
+
+if err is not None:
+    print(err)
+
+dbx.exec('DROP TABLE IF EXISTS pmod_copy')
+
+
+# %%
+# independent queries fan out over the async pool
+
+
+async def dashboard():
+    adbx = pmod.AsyncDBX(kv=env, prefix='DB', pool_max=4)
+    results = await adbx.gather_fetches([
+        'SELECT count(*) AS total FROM nc_3tf8__member',
+        ('SELECT * FROM nc_3tf8__member WHERE house = %s', ['A']),
+        'SELECT now() AS ts',
+    ])
+    await adbx.close()
+    return results
+
+
+for rows, err in asyncio.run(dashboard()):
+    if err is not None:
+        print(err)
+    else:
+        pmod.print_table(rows)
+
+
+# %%
+# time zone is a startup option, a fetch is one statement plus the commit
+rows, err = dbx.fetches(query='SELECT now() AS ts')
+print(rows, err)
+print(dbx.stats())
+
+
+# %%
+# repeated query in a loop is parsed and planned once per pooled connection
+dbx_prepared = pmod.DBX(kv=env, prefix='DB', pool=True, prepare_cache_size=32)
+
+for house in ['A', 'B', 'C', 'A', 'B']:
+    rows, err = dbx_prepared.fetches('SELECT * FROM nc_3tf8__member WHERE house = %s', [house])
+    if err is not None:
+        print(err)
+        break
+
+# utility statements are never prepared, they run as sent
+err = dbx_prepared.exec('CREATE TEMP TABLE pmod_prepared (id int)')
+print(err, dbx_prepared.stats())
+dbx_prepared.close()
+
+
+# %%
+# read-mostly lookups served from the result cache, persisted across runs
+dbx_cached = pmod.DBX(kv=env, prefix='DB', cache=pmod.DBXCache(ttl=600, path='.cache/dbx'))
+
+for _ in range(3):
+    rows, err = dbx_cached.fetches(query=query)
+
+dbx_cached.exec('UPDATE nc_3tf8__member SET house = house WHERE false')
+rows, err = dbx_cached.fetches(query=query)
+print(dbx_cached.stats()['cache'])
+
+dbx_cached.invalidate(query)
+rows, err = dbx_cached.fetches(query=query)
+print(dbx_cached.stats()['cache'])
+
+
+# %%
+# one connection and one commit for the whole unit of work
+err = dbx.exec('CREATE TABLE IF NOT EXISTS pmod_tx (id int PRIMARY KEY, name text)')
+
+with dbx.transaction() as tx:
+    tx.exec_batch([
+        ('INSERT INTO pmod_tx VALUES (%s, %s)', [1, 'one']),
+        ('INSERT INTO pmod_tx VALUES (%s, %s)', [2, 'two']),
+    ])
+
+    with tx.savepoint():
+        err = tx.exec('INSERT INTO pmod_tx VALUES (%s, %s)', [1, 'duplicate'])
+        print(f'rolled back to savepoint: {err}')
+
+    rows, err = tx.fetches('SELECT * FROM pmod_tx ORDER BY id')
+    pmod.print_table(rows)
+
+print(tx.err)
+dbx.exec('DROP TABLE IF EXISTS pmod_tx')
+
+
+# %%
+# column oriented result, numpy arrays or an arrow table
+columns, err = dbx.fetch_columns('SELECT g AS id, g * 0.5 AS half, now() AS ts FROM generate_series(1, 100000) AS g')
+if err is not None:
+    print(err)
+else:
+    print({name: (values.dtype, values.sum() if name != 'ts' else values.max()) for name, values in columns.items()})
+
+table, err = dbx.fetch_columns(query=query, arrow=True)
+print(err if err is not None else table.schema)
+
+with dbx.transaction() as tx:
+    columns, err = tx.fetch_columns('SELECT g AS id FROM generate_series(1, 10) AS g')
+    print(err if err is not None else columns['id'].dtype)
+
+
+# %%
+# a million rows through the streaming print_table, memory stays flat
+
+rows, err = dbx.iter_fetches(query='SELECT g AS id, md5(g::text) AS hash, now() AS ts FROM generate_series(1, 1000000) AS g', batch_size=5000)
+if err is not None:
+    print(err)
+else:
+    tracemalloc.start()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        pmod.print_table(rows, sample=1000, width=40)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'peak {peak / 1024 / 1024:.1f} MiB')
+
+
+# %%
+# export a streamed result, straight from the server side cursor to disk
+os.makedirs('.cache/export', exist_ok=True)
+export_query = 'SELECT g AS id, md5(g::text) AS hash, now() AS ts FROM generate_series(1, 100000) AS g'
+
+for name, export in [('rows.csv', pmod.export_csv), ('rows.tsv', pmod.export_tsv), ('rows.jsonl', pmod.export_jsonl), ('rows.parquet', pmod.export_parquet)]:
+    rows, err = dbx.iter_fetches(query=export_query, batch_size=5000)
+    if err is not None:
+        print(err)
+        break
+
+    start = time.perf_counter()
+    count = export(rows, f'.cache/export/{name}')
+    print(f'{name:<12}: {count} rows, {time.perf_counter() - start:.3f}s, {os.path.getsize(f".cache/export/{name}") / 1024 / 1024:.1f} MiB')
+
+
+# %%
+# a column that is NULL for the whole first chunk still gets its real type
+
+count = pmod.export_parquet(({'id': i, 'note': None if i < 3 else 'x'} for i in range(10)), '.cache/export/nullable.parquet', chunk_rows=3)
+print(count, pq.read_schema('.cache/export/nullable.parquet'))
+
+# a column NULL past infer_rows is not held back, it is written as strings
+count = pmod.export_parquet(({'id': i, 'deleted_at': None} for i in range(1000000)), '.cache/export/all_null.parquet', infer_rows=50000)
+print(count, pq.read_schema('.cache/export/all_null.parquet'))
+
+
 # %%
@@ -0,0 +1,50 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+# %%
+import pmod
+import os
+import sys
+import time
+import tracemalloc
+sys.path.insert(1, os.path.split(
+    os.path.dirname(os.path.abspath(__file__)))[0])
+
+
+env = pmod.get_env('.env')
+dbx = pmod.DBX(kv=env, prefix='DB', pool=True)
+
+# wide synthetic table, no fixture needed
+columns = ', '.join([f'g * {i} AS c{i}' for i in range(20)])
+query: str = f'SELECT g AS id, {columns} FROM generate_series(1, 200000) AS g'
+
+
+# %%
+# benchmark: row format vs the default dict rows
+dbx.fetches(query='SELECT 1')
+
+for row_format in pmod.DBXRowFormat:
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows, err = dbx.fetches(query=query, row_format=row_format)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if err is not None:
+        print(err)
+        break
+
+    print(f'{row_format.name:<10} : {elapsed:.3f}s, peak {peak / 1024 / 1024:.1f} MiB')
+
+dbx.close()
+
+
+# %%
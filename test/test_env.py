@@ -0,0 +1,92 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+# %%
+import os
+import sys
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(1, os.path.split(
+    os.path.dirname(os.path.abspath(__file__)))[0])
+
+import pmod
+from pmod import eval
+
+tmp = tempfile.mkdtemp()
+base = os.path.join(tmp, 'base.env')
+local = os.path.join(tmp, 'local.env')
+
+with open(base, 'w') as file:
+    file.write('DB_HOST=localhost\nDB_PORT=5432\n')
+with open(local, 'w') as file:
+    file.write('DB_PORT=6432\n')
+
+
+# %%
+# parsed once, later calls only stat the files
+env = pmod.get_env(base, local)
+assert env == {'DB_HOST': 'localhost', 'DB_PORT': '6432'}
+
+start = time.perf_counter()
+for _ in range(10000):
+    pmod.get_env(base, local)
+print(f'get_env: {(time.perf_counter() - start) / 10000 * 1_000_000:.1f} µs per call')
+
+
+# %%
+# frozen merged view, shared between calls and read-only
+view = pmod.get_env(base, local, frozen=True)
+assert view is pmod.get_env(base, local, frozen=True)
+
+with open(local, 'w') as file:
+    file.write('DB_PORT=7432\n')
+assert pmod.get_env(base, local)['DB_PORT'] == '7432'
+
+
+# %%
+# watch mode, a background thread picks up edits
+changes = []
+with pmod.EnvWatch(base, local, interval=0.05, on_change=changes.append) as env:
+    with open(local, 'w') as file:
+        file.write('DB_PORT=8432\nDB_NAME=pmod\n')
+    time.sleep(0.3)
+
+    assert env['DB_PORT'] == '8432' and env['DB_NAME'] == 'pmod'
+    assert len(changes) == 1
+
+
+# %%
+# batch replace, exact keys only, one atomic write
+
+deploy = os.path.join(tmp, 'deploy.env')
+with open(deploy, 'w') as file:
+    file.write('# deploy\nIMAGE_TAG=1.0.0\nOLD_IMAGE_TAG=0.9.0\nexport REPLICAS=2\n')
+
+replaced = eval.replace_env_values(deploy, {'IMAGE_TAG': '1.1.0', 'REPLICAS': '3', 'MISSING': 'x'})
+assert replaced == ['IMAGE_TAG', 'REPLICAS']
+with open(deploy) as file:
+    assert file.read() == '# deploy\nIMAGE_TAG=1.1.0\nOLD_IMAGE_TAG=0.9.0\nexport REPLICAS=3\n'
+
+
+# %%
+# concurrent writers serialise on the lock, no update is lost
+with open(deploy, 'w') as file:
+    file.write(''.join([f'KEY_{i}=0\n' for i in range(20)]))
+
+with ThreadPoolExecutor(max_workers=20) as executor:
+    list(executor.map(lambda i: eval.replace_env_values(deploy, {f'KEY_{i}': str(i)}), range(20)))
+
+assert pmod.get_env(deploy) == {f'KEY_{i}': str(i) for i in range(20)}
+# the lock file stays out of the env file's directory (often a git checkout)
+assert [name for name in os.listdir(tmp) if name.endswith('.lock')] == []
+
+
+# %%
@@ -0,0 +1,82 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+# %%
+import io
+import os
+import sys
+import json
+import time
+import jsonpickle
+import contextlib
+from pygments import highlight
+from pygments.lexers import get_lexer_by_name
+from pygments.formatters import TerminalFormatter
+sys.path.insert(1, os.path.split(
+    os.path.dirname(os.path.abspath(__file__)))[0])
+
+from pmod import eval
+
+
+class Order:
+    def __init__(self, i: int):
+        self.id = i
+        self.code = f'ORD-{i:08d}'
+        self.amount = i * 1.25
+        self.tags = ['buy', 'currency', str(i % 7)]
+        self.detail = {'unit': i % 100, 'note': 'lorem ipsum dolor sit amet'}
+
+
+# a few MB once printed
+orders = [Order(i) for i in range(30000)]
+payload = jsonpickle.encode(orders, unpicklable=False)
+print(f'payload: {len(payload) / 1024 / 1024:.1f} MiB')
+
+
+def timed(name: str, func):
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        func()
+    print(f'{name:<28}: {time.perf_counter() - start:.3f}s')
+
+
+# %%
+# serialization, like for like: output goes to devnull, which is not a tty, so neither side highlights
+def old_print_object():
+    json_object = json.loads(jsonpickle.encode(orders, unpicklable=False))
+    print(json.dumps(json_object, indent=2, sort_keys=True))
+
+
+def old_print_json():
+    print(json.dumps(json.loads(payload), indent=2, sort_keys=True))
+
+
+timed('old print_object', old_print_object)
+timed('print_object', lambda: eval.print_object(orders))
+timed('old print_json', old_print_json)
+timed('print_json', lambda: eval.print_json(payload))
+
+
+# %%
+# highlighting, timed on its own: what a terminal used to pay on this payload, the printers skip it past PRINT_HIGHLIGHT_LIMIT
+json_str = json.dumps(json.loads(payload), indent=2, sort_keys=True)
+timed('highlight json', lambda: print(highlight(json_str, get_lexer_by_name('json'), TerminalFormatter())))
+timed('highlight 256 KiB', lambda: print(highlight(json_str[:eval.PRINT_HIGHLIGHT_LIMIT], get_lexer_by_name('json'), TerminalFormatter())))
+
+
+# %%
+# integers past 64 bit stay exact
+out = io.StringIO()
+with contextlib.redirect_stdout(out):
+    eval.print_json('{"id": 123456789012345678901234567890}')
+assert '123456789012345678901234567890' in out.getvalue()
+
+
+# %%
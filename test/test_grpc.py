@@ -0,0 +1,58 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+# %%
+import os
+import sys
+sys.path.insert(1, os.path.split(
+    os.path.dirname(os.path.abspath(__file__)))[0])
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+from pmod import eval
+from grpc_server import Ping, PingServiceStub, serve
+
+client = eval.GrpcClient(f'127.0.0.1:{serve()}', PingServiceStub, channels=2)
+
+
+# %%
+# unary, the channel is reused between calls
+res = client.call(Ping, lambda service: service.ping(message='hi'))
+assert res.message == 'hi'
+
+
+# %%
+# fan out unary calls, at most 8 in flight
+results = client.call_many(Ping, [lambda service, i=i: service.ping(message=str(i)) for i in range(100)], concurrency=8)
+assert [res.message for res, _ in results] == [str(i) for i in range(100)]
+
+
+# %%
+# per call deadline
+results = client.call_many(Ping, [lambda service: service.slow(message='late')], timeout=0.2)
+assert isinstance(results[0][1], TimeoutError)
+
+
+# %%
+# server streaming, messages arrive one by one
+assert [res.count for res in client.stream(Ping, lambda service: service.count(count=5))] == [0, 1, 2, 3, 4]
+
+
+# %%
+# bidi streaming
+replies = client.bidi(Ping, '/pmod.test.PingService/Echo', Ping, [Ping(message=word) for word in ['a', 'b', 'c']])
+assert [res.message for res in replies] == ['A', 'B', 'C']
+
+
+# %%
+eval.print_object(client.stats())
+client.close()
+
+
+# %%
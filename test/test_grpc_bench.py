@@ -0,0 +1,46 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+# %%
+import os
+import sys
+sys.path.insert(1, os.path.split(
+    os.path.dirname(os.path.abspath(__file__)))[0])
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+from pmod import eval
+from grpc_server import PingService, PingServiceStub, serve
+
+
+# %%
+# a few ms of latency and an occasional UNAVAILABLE
+port = serve(PingService(latency=(0.001, 0.005), failure_rate=0.01))
+client = eval.GrpcClient(f'127.0.0.1:{port}', PingServiceStub, channels=2)
+
+
+# %%
+# closed loop, fixed concurrency
+report = client.bench(lambda service: service.ping(message='hi'), name='PingService/Ping', concurrency=16, duration=3)
+assert report.requests > 0
+assert report.outcomes.get('OK', 0) > 0
+assert report.latency.percentile(50) <= report.latency.percentile(99)
+
+
+# %%
+# open loop, fixed arrival rate, json report
+report = client.bench(lambda service: service.ping(message='hi'), rps=300, concurrency=32, duration=3, as_json=True)
+assert abs(report.requests - 900) < 90
+
+
+# %%
+client.close()
+
+
+# %%
@@ -26,4 +26,39 @@ header = {
 
 _, _ = eval.get(url=url, style=style.with_header, header=header)
 
-# %%
\ No newline at end of file
+# %%
+# every helper shares one pooled keep-alive session
+eval.set_http_client(pool_maxsize=20, retries=2, timeout=10)
+
+for _ in range(3):
+    status, _ = eval.get(url=url, header=header)
+    print(status)
+
+
+# %%
+# health check fan-out, results come back in request order
+reqs = [
+    url,
+    eval.HttpRequest(url, header=header),
+    eval.HttpRequest('https://httpbin.org/post', method='post', body={'ping': 1}),
+]
+
+results, timings = eval.batch(reqs, concurrency=8, style=style.content_only)
+for (status, _), elapsed in zip(results, timings):
+    print(f'{status} {elapsed * 1000:.1f} ms')
+
+
+# %%
+# streamed body: ndjson rendered line by line, large download straight to disk
+status, size = eval.stream('https://httpbin.org/stream/20', format=eval.StreamFormat.ndjson)
+print(status, size)
+
+status, size = eval.stream('https://httpbin.org/bytes/1048576', output='/tmp/pmod-download.bin', style=style.hidden)
+print(status, size)
+
+status, events = eval.iter_stream('https://sse.dev/test', format=eval.StreamFormat.sse)
+for i, event in zip(range(3), events):
+    print(event)
+
+
+# %%
@@ -0,0 +1,66 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+# %%
+import os
+import sys
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(1, os.path.split(
+    os.path.dirname(os.path.abspath(__file__)))[0])
+
+from pmod import eval
+
+
+# %%
+# local stand-in server, a few ms of latency and an occasional 500
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(random.uniform(0.001, 0.005))
+        status = 500 if random.random() < 0.01 else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        ...
+
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f'http://127.0.0.1:{server.server_port}/health'
+
+
+# %%
+# closed loop, fixed concurrency
+report = eval.load(url, concurrency=8, duration=3)
+assert report.requests > 0
+assert report.latency.percentile(50) <= report.latency.percentile(99)
+
+
+# %%
+# open loop, fixed arrival rate, json report
+report = eval.load(url, rps=200, concurrency=32, duration=3, as_json=True)
+assert abs(report.requests - 600) < 60
+
+
+# %%
+server.shutdown()
+
+
+# %%
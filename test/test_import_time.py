@@ -0,0 +1,63 @@
+'''
+Copyright (c) 2025.
+Created by Andy Pangaribuan (iam.pangaribuan@gmail.com)
+https://github.com/apangaribuan
+
+This product is protected by copyright and distributed under
+licenses restricting copying, distribution and decompilation.
+All Rights Reserved.
+'''
+
+# %%
+import os
+import sys
+import subprocess
+
+root = os.path.split(os.path.dirname(os.path.abspath(__file__)))[0]
+
+
+def import_ms(code: str, runs: int = 5) -> tuple[float, list[str]]:
+    # best of a few `python -X importtime` runs, counting only what the snippet imports on top of interpreter startup
+    def run(snippet: str) -> dict[str, tuple[int, bool]]:
+        res = subprocess.run([sys.executable, '-X', 'importtime', '-c', snippet], cwd=root, capture_output=True, text=True, env={**os.environ, 'PYTHONPATH': root})
+        if res.returncode != 0:
+            raise RuntimeError(res.stderr)
+
+        # name → (cumulative µs, top level)
+        modules = {}
+        for line in res.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            modules[name.strip()] = (int(cumulative), not name.startswith('   '))
+        return modules
+
+    startup = run('pass')
+    best = None
+    for _ in range(runs):
+        modules = {name: value for name, value in run(code).items() if name not in startup}
+        total = sum([us for us, top in modules.values() if top]) / 1000
+        if best is None or total < best[0]:
+            best = (total, sorted(modules, key=lambda name: -modules[name][0]))
+    return best
+
+
+# %%
+# import-time budget, ms on a warm cache; the heavy modules must stay out of these paths
+budgets = [
+    ('import pmod',                                                 15, []),
+    ('import pmod; pmod.get_env',                                   40, ['psycopg2', 'requests', 'grpclib', 'rich']),
+    ('from pmod import eval',                                       40, ['requests', 'grpclib', 'rich', 'pygments', 'jsonpickle', 'unsync']),
+    ('from pmod import eval; eval.get_env',                         40, ['requests', 'grpclib', 'rich', 'pygments', 'jsonpickle', 'unsync']),
+]
+
+for code, budget, excluded in budgets:
+    elapsed, modules = import_ms(code)
+    print(f'{code:<40}: {elapsed:6.1f} ms (budget {budget} ms), top: {", ".join(modules[:3])}')
+    assert elapsed <= budget, f'{code} took {elapsed:.1f} ms, budget {budget} ms'
+
+    leaked = [name for name in excluded if any(module == name or module.startswith(f'{name}.') for module in modules)]
+    assert len(leaked) == 0, f'{code} imported {leaked}'
+
+
+# %%